@@ -0,0 +1,50 @@
+"""Upcoming agenda shown on profile pages.
+
+Read from the user's timeline in one index range scan. Events that already
+have a linked calendar entry are skipped using a set of the event ids those
+entries point at.
+"""
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.utils import timezone
+
+from home.models import TimelineEntry
+
+# Days ahead covered by the agenda; override with settings.AGENDA_HORIZON_DAYS
+DEFAULT_HORIZON_DAYS = 90
+
+
+def upcoming(user, role, start=None, horizon_days=None):
+    """Return the user's agenda from ``start`` (today) over the horizon, in time order.
+
+    Organizers see the published events they organise, and performers the
+    events they were accepted to, alongside their own calendar entries.
+    """
+    if start is None:
+        start = timezone.now().date()
+    if horizon_days is None:
+        horizon_days = getattr(settings, 'AGENDA_HORIZON_DAYS', DEFAULT_HORIZON_DAYS)
+    end = start + timedelta(days=horizon_days)
+
+    event_kind = 'organizing' if role == 'organizer' else 'performing'
+    rows = list(
+        TimelineEntry.objects
+        .filter(user=user, kind__in=['calendar', event_kind], date__gte=start, date__lt=end)
+        .order_by('date', 'start_time', 'id')
+        .values('kind', 'title', 'date', 'start_time', 'end_time', 'location', 'event_id')
+    )
+    linked_event_ids = {row['event_id'] for row in rows if row['kind'] == 'calendar' and row['event_id']}
+
+    return [
+        SimpleNamespace(
+            title=row['title'],
+            date=row['date'],
+            start_time=row['start_time'],
+            end_time=row['end_time'],
+            location=row['location'],
+        )
+        for row in rows
+        if row['kind'] == 'calendar' or row['event_id'] not in linked_event_ids
+    ]
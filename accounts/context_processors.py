@@ -0,0 +1,6 @@
+def roles(request):
+    # Requests that skipped the middleware (e.g. some error pages) get False
+    return {
+        'is_organizer': getattr(request, 'is_organizer', False),
+        'is_performer': getattr(request, 'is_performer', False),
+    }
@@ -0,0 +1,61 @@
+"""Denormalised unread counters on Profile.
+
+Counters are adjusted with F() expressions next to the writes that change
+unread state, so rendering a badge is a read of the user's Profile row.
+``reconcile`` recomputes them from the source tables to repair any drift.
+"""
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Message, Notification, Profile
+
+
+def _adjust(field, user_ids, amount):
+    if not amount or not user_ids:
+        return
+    Profile.objects.filter(user_id__in=user_ids).update(**{field: Greatest(F(field) + amount, 0)})
+
+
+def adjust_unread_notifications(user_ids, amount):
+    _adjust('unread_notifications', user_ids, amount)
+
+
+def adjust_unread_messages(user_ids, amount):
+    _adjust('unread_messages', user_ids, amount)
+
+
+def _expected_counts():
+    unread_notifications = Notification.objects.filter(
+        user=OuterRef('user'),
+        is_read=False
+    ).order_by().values('user').annotate(count=Count('id')).values('count')
+    unread_messages = Message.objects.filter(
+        conversation__participants=OuterRef('user'),
+        is_read=False
+    ).exclude(sender=OuterRef('user')).order_by().values('conversation__participants').annotate(
+        count=Count('id')
+    ).values('count')
+    return {
+        'expected_notifications': Coalesce(Subquery(unread_notifications), 0),
+        'expected_messages': Coalesce(Subquery(unread_messages), 0),
+    }
+
+
+def reconcile(user_ids=None):
+    """Reset drifted counters from the source tables. Returns the number repaired."""
+    profiles = Profile.objects.all()
+    if user_ids is not None:
+        profiles = profiles.filter(user_id__in=user_ids)
+    drifted = list(
+        profiles.annotate(**_expected_counts()).filter(
+            ~Q(unread_notifications=F('expected_notifications')) |
+            ~Q(unread_messages=F('expected_messages'))
+        ).values_list('pk', flat=True)
+    )
+    if drifted:
+        expected = _expected_counts()
+        Profile.objects.filter(pk__in=drifted).update(
+            unread_notifications=expected['expected_notifications'],
+            unread_messages=expected['expected_messages'],
+        )
+    return len(drifted)
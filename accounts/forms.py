@@ -1,4 +1,5 @@
 from django import forms
+from django.db import transaction
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from .models import Profile
@@ -29,13 +30,11 @@ class CustomSignupForm(UserCreationForm):
     def save(self, commit=True):
         user = super().save(commit=False)
         user.email = self.cleaned_data['email']
-        # Store the role on the user instance temporarily
+        # Picked up by the post_save handler that creates the profile
         user._role = self.cleaned_data['role']
+        user._bio = self.cleaned_data['bio']
         if commit:
-            user.save()
-            # The profile will be created by the signal handler
-            # We just need to update the bio
-            profile = user.profile
-            profile.bio = self.cleaned_data['bio']
-            profile.save()
-        return user 
\ No newline at end of file
+            # User and profile are written together or not at all
+            with transaction.atomic():
+                user.save()
+        return user
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from accounts import realtime
+
+class Command(BaseCommand):
+    help = 'Deletes relayed real-time events older than the retention window'
+
+    def handle(self, *args, **options):
+        deleted = realtime.prune_events()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} real-time events'))
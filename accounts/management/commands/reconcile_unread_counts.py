@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from accounts import counters
+
+class Command(BaseCommand):
+    help = 'Recomputes unread notification and message counters from the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--username',
+            type=str,
+            help='Only reconcile this user (optional)',
+        )
+
+    def handle(self, *args, **options):
+        username = options.get('username')
+        user_ids = None
+        if username:
+            user_ids = list(User.objects.filter(username=username).values_list('id', flat=True))
+            if not user_ids:
+                self.stdout.write(self.style.ERROR(f'User {username} does not exist'))
+                return
+
+        repaired = counters.reconcile(user_ids)
+        self.stdout.write(self.style.SUCCESS(f'Repaired unread counters for {repaired} profiles'))
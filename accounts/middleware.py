@@ -0,0 +1,20 @@
+from .models import ensure_profile
+
+
+class UserRoleMiddleware:
+    """Set ``request.is_organizer`` and ``request.is_performer`` once per request.
+
+    Must come after AuthenticationMiddleware, which loads the user together
+    with its profile. Users left without a profile get one here.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        role = None
+        if request.user.is_authenticated:
+            role = ensure_profile(request.user).role
+        request.is_organizer = role == 'organizer'
+        request.is_performer = role == 'performer'
+        return self.get_response(request)
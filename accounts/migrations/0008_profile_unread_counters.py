@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:15
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_unread_counters(apps, schema_editor):
+    Profile = apps.get_model('accounts', 'Profile')
+    Notification = apps.get_model('accounts', 'Notification')
+    Message = apps.get_model('accounts', 'Message')
+    unread_notifications = Notification.objects.filter(
+        user=OuterRef('user'),
+        is_read=False
+    ).order_by().values('user').annotate(count=Count('id')).values('count')
+    unread_messages = Message.objects.filter(
+        conversation__participants=OuterRef('user'),
+        is_read=False
+    ).exclude(sender=OuterRef('user')).order_by().values('conversation__participants').annotate(
+        count=Count('id')
+    ).values('count')
+    Profile.objects.update(
+        unread_notifications=Coalesce(Subquery(unread_notifications), 0),
+        unread_messages=Coalesce(Subquery(unread_messages), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_message_history_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='unread_messages',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='unread_notifications',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_unread_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_profile_unread_counters'),
+        ('home', '0006_availability_rules'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='calendarevent',
+            index=models.Index(fields=['user', 'date', 'start_time'], name='accounts_cal_user_date_idx'),
+        ),
+    ]
@@ -17,6 +17,9 @@ class Profile(models.Model):
     email_notifications = models.BooleanField(default=True)
     application_updates = models.BooleanField(default=True)
     show_profile = models.BooleanField(default=True)
+    # Denormalised badge counts, maintained by accounts.counters
+    unread_notifications = models.PositiveIntegerField(default=0)
+    unread_messages = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -43,6 +46,12 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Serves paging back through a conversation by (created_at, id)
+            models.Index(fields=['conversation', 'created_at'], name='accounts_msg_conv_created_idx'),
+            # Keeps marking a thread read proportional to its unread messages
+            models.Index(fields=['conversation'], condition=models.Q(is_read=False), name='accounts_msg_unread_idx'),
+        ]
 
     def __str__(self):
         return f"Message from {self.sender.username} in {self.conversation}"
@@ -69,23 +78,26 @@ class Notification(models.Model):
     def __str__(self):
         return f"{self.notification_type} notification for {self.user.username}"
 
-# Signal to create/update UserProfile when User is created/updated
+# Create the profile with the user. Later saves (last_login updates, profile
+# edits) touch no Profile rows; ensure_profile covers users created without one.
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
-        # Get the role from the form data if available
-        role = getattr(instance, '_role', 'performer')  # Default to performer if not set
-        Profile.objects.create(user=instance, role=role)
-
-@receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    # Get or create the profile
-    profile, created = Profile.objects.get_or_create(user=instance)
-    if created:
-        # If profile was just created, set the role from the form data if available
-        role = getattr(instance, '_role', 'performer')  # Default to performer if not set
-        profile.role = role
-        profile.save()
+        # The signup form passes the chosen role and bio on the instance
+        Profile.objects.create(
+            user=instance,
+            role=getattr(instance, '_role', 'performer'),
+            bio=getattr(instance, '_bio', ''),
+        )
+
+def ensure_profile(user):
+    """Return ``user.profile``, creating a default one if the user has none."""
+    try:
+        return user.profile
+    except Profile.DoesNotExist:
+        profile, _ = Profile.objects.get_or_create(user=user, defaults={'role': 'performer'})
+        user.profile = profile
+        return profile
 
 class CalendarEvent(models.Model):
     EVENT_TYPES = [
@@ -112,3 +124,19 @@ class CalendarEvent(models.Model):
 
     class Meta:
         ordering = ['date', 'start_time']
+        indexes = [
+            # Serves per-day booking lookups when checking for double-booking
+            models.Index(fields=['user', 'date', 'start_time'], name='accounts_cal_user_date_idx'),
+        ]
+
+class RealtimeEvent(models.Model):
+    # Outbox read by accounts.realtime.DatabaseBroker, so events published by
+    # one process (e.g. the job worker) reach streams held open by another.
+    # Rows are pruned a minute after they are written, by the broker's
+    # poller, run_worker or the prune_realtime_events command.
+    user_id = models.BigIntegerField()
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.payload.get('type')} for {self.user_id}"
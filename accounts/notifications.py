@@ -0,0 +1,50 @@
+"""Batched notification fan-out.
+
+``fan_out`` writes one Notification per recipient with ``bulk_create`` in
+fixed-size batches inside a single transaction, bumps the recipients' unread
+counters per batch, and pushes the new rows once the transaction commits.
+"""
+from django.db import transaction
+
+from . import counters, realtime
+from .models import Notification, Profile
+
+NOTIFICATION_BATCH_SIZE = 500
+# Notification types users can switch off with Profile.application_updates
+OPT_OUT_TYPES = {'application', 'event'}
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def fan_out(user_ids, notification_type, title, message, link=''):
+    """Notify every user in ``user_ids``. Returns the number of notifications created."""
+    user_ids = sorted(set(user_ids))
+    created = []
+    with transaction.atomic():
+        for batch in _batches(user_ids, NOTIFICATION_BATCH_SIZE):
+            if notification_type in OPT_OUT_TYPES:
+                batch = list(Profile.objects.filter(
+                    user_id__in=batch,
+                    application_updates=True
+                ).values_list('user_id', flat=True))
+            if not batch:
+                continue
+            created.extend(Notification.objects.bulk_create([
+                Notification(
+                    user_id=user_id,
+                    notification_type=notification_type,
+                    title=title,
+                    message=message,
+                    link=link,
+                )
+                for user_id in batch
+            ]))
+            counters.adjust_unread_notifications(batch, 1)
+
+        # bulk_create skips post_save, so push the rows here instead
+        events = [(notification.user_id, realtime.notification_event(notification)) for notification in created]
+        transaction.on_commit(lambda: realtime.publish_many(events))
+    return len(created)
@@ -0,0 +1,246 @@
+"""Server push of new messages and notifications.
+
+Signal handlers publish events to a broker, and the ``event_stream`` view
+subscribes per user and relays them as Server-Sent Events. The broker class
+comes from ``settings.REALTIME_BROKER``. ``InProcessBroker`` only reaches
+clients connected to the publishing process; ``DatabaseBroker`` (the default)
+and ``RedisBroker`` also carry events published by other web workers and by
+the job worker, which creates most notifications.
+
+``DatabaseBroker`` rows are pruned by its own poller while streams are open,
+and otherwise by ``run_worker`` or ``manage.py prune_realtime_events``.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from datetime import timedelta
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import RealtimeEvent
+
+# Events queued for a slow client before newer ones are dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+# How often DatabaseBroker checks for events from other processes
+POLL_SECONDS = 1
+# How long published rows are kept for pollers that are running behind
+RETENTION_SECONDS = 60
+
+
+class InProcessBroker:
+    """Fan events out to subscribers connected to this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def publish(self, user_id, event):
+        # Publishers run in sync views on worker threads, so hand the event
+        # to each subscriber's event loop rather than touching its queue.
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # The subscriber's loop has already shut down
+                self._remove(subscription)
+
+    def publish_many(self, events):
+        for user_id, event in events:
+            self.publish(user_id, event)
+
+    def subscribe(self, user_id):
+        subscription = _QueueSubscription(self, user_id)
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def _remove(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+
+class _QueueSubscription:
+    def __init__(self, broker, user_id):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def offer(self, event):
+        if not self.queue.full():
+            self.queue.put_nowait(event)
+
+    async def get(self, timeout):
+        """Return the next event, or None if none arrives within ``timeout``."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self.broker._remove(self)
+
+
+class DatabaseBroker(InProcessBroker):
+    """Share events between processes through the RealtimeEvent table.
+
+    ``publish`` stores a row, and ``publish_many`` stores a batch of rows in
+    one INSERT. Each process with subscribers runs one poller
+    that reads rows newer than the last it saw every ``POLL_SECONDS`` and
+    fans them out to its own subscribers.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._poller = None
+
+    def publish(self, user_id, event):
+        RealtimeEvent.objects.create(user_id=user_id, payload=event)
+
+    def publish_many(self, events):
+        RealtimeEvent.objects.bulk_create([
+            RealtimeEvent(user_id=user_id, payload=event) for user_id, event in events
+        ])
+
+    def subscribe(self, user_id):
+        subscription = super().subscribe(user_id)
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.get_running_loop().create_task(self._poll(timezone.now()))
+        return subscription
+
+    async def _poll(self, since):
+        # The first poll picks up rows written since the poller started; later
+        # ones follow the id. (Reading the latest id up front would race with
+        # events published while that query waits for a thread.)
+        last_id = None
+        pruned_at = since
+        while self._subscribers:
+            await asyncio.sleep(POLL_SECONDS)
+            for event_id, user_id, payload in await sync_to_async(_events_after)(last_id, since):
+                last_id = event_id
+                super().publish(user_id, payload)
+            if timezone.now() - pruned_at > timedelta(seconds=RETENTION_SECONDS):
+                pruned_at = timezone.now()
+                await sync_to_async(prune_events)()
+
+
+def _events_after(last_id, since):
+    events = RealtimeEvent.objects.order_by('id')
+    if last_id is None:
+        events = events.filter(created_at__gte=since)
+    else:
+        events = events.filter(id__gt=last_id)
+    return list(events.values_list('id', 'user_id', 'payload'))
+
+
+def prune_events():
+    """Delete RealtimeEvent rows past retention. Returns the number deleted."""
+    before = timezone.now() - timedelta(seconds=RETENTION_SECONDS)
+    deleted, _ = RealtimeEvent.objects.filter(created_at__lt=before).delete()
+    return deleted
+
+
+class RedisBroker:
+    """Share events between workers through Redis pub/sub.
+
+    Requires the ``redis`` package and ``settings.REALTIME_REDIS_URL``.
+    """
+
+    def __init__(self):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImproperlyConfigured('RedisBroker requires the redis package.') from e
+        self.url = getattr(settings, 'REALTIME_REDIS_URL', None)
+        if not self.url:
+            raise ImproperlyConfigured('RedisBroker requires settings.REALTIME_REDIS_URL.')
+        self._client = redis.Redis.from_url(self.url)
+
+    def publish(self, user_id, event):
+        self._client.publish(_channel(user_id), json.dumps(event))
+
+    def publish_many(self, events):
+        pipeline = self._client.pipeline(transaction=False)
+        for user_id, event in events:
+            pipeline.publish(_channel(user_id), json.dumps(event))
+        pipeline.execute()
+
+    def subscribe(self, user_id):
+        return _RedisSubscription(self.url, _channel(user_id))
+
+
+class _RedisSubscription:
+    def __init__(self, url, channel):
+        import redis.asyncio
+
+        self.channel = channel
+        self.client = redis.asyncio.Redis.from_url(url)
+        self.pubsub = self.client.pubsub()
+        self.subscribed = False
+
+    async def get(self, timeout):
+        if not self.subscribed:
+            await self.pubsub.subscribe(self.channel)
+            self.subscribed = True
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        return json.loads(message['data']) if message else None
+
+    async def close(self):
+        await self.pubsub.unsubscribe(self.channel)
+        await self.pubsub.close()
+        await self.client.close()
+
+
+def _channel(user_id):
+    return f'realtime:user:{user_id}'
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(settings.REALTIME_BROKER)()
+
+
+def publish(user_ids, event):
+    publish_many((user_id, event) for user_id in user_ids)
+
+
+def publish_many(events):
+    """Publish ``(user_id, event)`` pairs in one batch."""
+    events = list(events)
+    if events:
+        get_broker().publish_many(events)
+
+
+def message_event(message, sender_username):
+    return {
+        'type': 'new_message',
+        'id': message.id,
+        'conversation_id': message.conversation_id,
+        'sender': sender_username,
+        'content': message.content,
+        'created_at': message.created_at.isoformat(),
+    }
+
+
+def notification_event(notification):
+    return {
+        'type': 'notification',
+        'id': notification.id,
+        'notification_type': notification.notification_type,
+        'title': notification.title,
+        'message': notification.message,
+        'link': notification.link,
+        'created_at': notification.created_at.isoformat(),
+    }
@@ -0,0 +1,47 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import counters, realtime
+from .models import Conversation, Message, Notification
+
+
+# Push new messages and notifications to connected clients once the rows
+# they describe are committed.
+def message_recipients(message):
+    return list(
+        Conversation.participants.through.objects.filter(
+            conversation_id=message.conversation_id
+        ).exclude(user_id=message.sender_id).values_list('user_id', flat=True)
+    )
+
+@receiver(post_save, sender=Message)
+def push_message(sender, instance, created, **kwargs):
+    if not created:
+        return
+    recipients = message_recipients(instance)
+    counters.adjust_unread_messages(recipients, 1)
+    event = realtime.message_event(instance, instance.sender.username)
+    events = [(user_id, event) for user_id in recipients]
+    transaction.on_commit(lambda: realtime.publish_many(events))
+
+@receiver(post_save, sender=Notification)
+def push_notification(sender, instance, created, **kwargs):
+    if not created:
+        return
+    if not instance.is_read:
+        counters.adjust_unread_notifications([instance.user_id], 1)
+    event = realtime.notification_event(instance)
+    transaction.on_commit(lambda: realtime.publish([instance.user_id], event))
+
+@receiver(post_delete, sender=Notification)
+def uncount_notification(sender, instance, **kwargs):
+    if not instance.is_read:
+        counters.adjust_unread_notifications([instance.user_id], -1)
+
+# pre_delete rather than post_delete: when a conversation is deleted, its
+# participant rows may already be gone by the time post_delete fires.
+@receiver(pre_delete, sender=Message)
+def uncount_message(sender, instance, **kwargs):
+    if not instance.is_read:
+        counters.adjust_unread_messages(message_recipients(instance), -1)
@@ -1,3 +1,281 @@
-from django.test import TestCase
+from datetime import time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models.signals import pre_save
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from home.availability import occurrences
+from home.models import AvailabilityRule
+
+from . import counters, realtime
+from .models import Conversation, Message, Notification, Profile, RealtimeEvent
+from .notifications import fan_out
+
+
+class UnreadCounterTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice', password='pw')
+        self.bob = User.objects.create_user('bob', password='pw')
+        self.conversation = Conversation.objects.create()
+        self.conversation.participants.add(self.alice, self.bob)
+
+    def counts(self, user):
+        profile = Profile.objects.get(user=user)
+        return profile.unread_notifications, profile.unread_messages
+
+    def test_new_message_counts_for_recipients_only(self):
+        Message.objects.create(conversation=self.conversation, sender=self.alice, content='hi')
+        self.assertEqual(self.counts(self.bob), (0, 1))
+        self.assertEqual(self.counts(self.alice), (0, 0))
+
+    def test_opening_conversation_clears_message_count(self):
+        for _ in range(3):
+            Message.objects.create(conversation=self.conversation, sender=self.alice, content='hi')
+        self.client.force_login(self.bob)
+        self.client.get(reverse('conversation', args=[self.conversation.id]))
+        self.assertEqual(self.counts(self.bob), (0, 0))
+        # A second visit must not drive the counter below zero
+        self.client.get(reverse('conversation', args=[self.conversation.id]))
+        self.assertEqual(self.counts(self.bob), (0, 0))
+
+    def test_notifications_count_until_read(self):
+        first = Notification.objects.create(user=self.bob, notification_type='system', title='One', message='m')
+        Notification.objects.create(user=self.bob, notification_type='system', title='Two', message='m')
+        Notification.objects.create(user=self.bob, notification_type='system', title='Read', message='m', is_read=True)
+        self.assertEqual(self.counts(self.bob), (2, 0))
+
+        self.client.force_login(self.bob)
+        self.client.post(reverse('notifications'), {'notification_id': first.id})
+        self.client.post(reverse('notifications'), {'notification_id': first.id})
+        self.assertEqual(self.counts(self.bob), (1, 0))
+        self.client.post(reverse('mark_all_notifications_read'))
+        self.assertEqual(self.counts(self.bob), (0, 0))
+
+    def test_deleting_unread_notification_uncounts_it(self):
+        notification = Notification.objects.create(user=self.bob, notification_type='system', title='T', message='m')
+        notification.delete()
+        self.assertEqual(self.counts(self.bob), (0, 0))
+
+    def test_deleting_unread_messages_uncounts_them(self):
+        Message.objects.create(conversation=self.conversation, sender=self.alice, content='one')
+        second = Message.objects.create(conversation=self.conversation, sender=self.alice, content='two')
+        second.delete()
+        self.assertEqual(self.counts(self.bob), (0, 1))
+        # Participant rows go with the conversation; the counter must still drop
+        self.conversation.delete()
+        self.assertEqual(self.counts(self.bob), (0, 0))
+
+    def test_profile_edits_keep_concurrent_counter_updates(self):
+        # Another request bumps the counter between this request loading the
+        # profile and saving it
+        def concurrent_message(sender, instance, **kwargs):
+            counters.adjust_unread_messages([instance.user_id], 1)
+        pre_save.connect(concurrent_message, sender=Profile)
+        self.addCleanup(pre_save.disconnect, concurrent_message, sender=Profile)
+
+        self.client.force_login(self.bob)
+        self.client.post(reverse('update_profile'), {'username': 'bob', 'email': '', 'bio': 'Hi'})
+        self.client.post(f"{reverse('dashboard')}?tab=settings", {'show_profile': 'on'})
+        profile = Profile.objects.get(user=self.bob)
+        self.assertEqual((profile.bio, profile.show_profile, profile.unread_messages), ('Hi', True, 2))
+
+    def test_reconcile_repairs_drift(self):
+        Message.objects.create(conversation=self.conversation, sender=self.alice, content='hi')
+        Notification.objects.create(user=self.bob, notification_type='system', title='T', message='m')
+        Profile.objects.filter(user=self.bob).update(unread_notifications=9, unread_messages=0)
+        self.assertEqual(counters.reconcile(), 1)
+        self.assertEqual(self.counts(self.bob), (1, 1))
+        self.assertEqual(counters.reconcile(), 0)
+
+
+class SignupProfileTests(TestCase):
+    def test_signup_creates_profile_with_role_and_bio(self):
+        response = self.client.post(reverse('signup'), {
+            'username': 'newbie',
+            'email': 'newbie@example.com',
+            'password1': 'Sup3r-secret-pw',
+            'password2': 'Sup3r-secret-pw',
+            'role': 'organizer',
+            'bio': 'Hello',
+        })
+        self.assertEqual(response.status_code, 302)
+        profile = Profile.objects.get(user__username='newbie')
+        self.assertEqual((profile.role, profile.bio), ('organizer', 'Hello'))
+
+    def test_saving_a_user_does_not_touch_its_profile(self):
+        user = User.objects.create_user('someone', password='pw')
+        user.last_name = 'Changed'
+        with CaptureQueriesContext(connection) as queries:
+            user.save()
+        self.assertFalse([query for query in queries if '"accounts_profile"' in query['sql']])
+
+
+class RequestProfileTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('performer', password='pw')
+        self.client.force_login(self.user)
+
+    def test_profile_loads_with_the_session_user(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('event_list'))
+        profile_queries = [query['sql'] for query in queries if '"accounts_profile"' in query['sql']]
+        self.assertEqual(len(profile_queries), 1)
+        self.assertIn('"auth_user"', profile_queries[0])
+        self.assertTrue(response.context['is_performer'])
+        self.assertFalse(response.context['is_organizer'])
+
+    def test_missing_profile_is_created_on_request(self):
+        Profile.objects.filter(user=self.user).delete()
+        self.client.get(reverse('event_list'))
+        self.assertTrue(Profile.objects.filter(user=self.user).exists())
+
+
+class InboxTests(TestCase):
+    def test_inbox_query_count_does_not_grow_with_conversations(self):
+        me = User.objects.create_user('me', password='pw')
+        self.client.force_login(me)
+
+        def start_conversations(count):
+            for _ in range(count):
+                other = User.objects.create_user(f'other{User.objects.count()}', password='pw')
+                conversation = Conversation.objects.create()
+                conversation.participants.add(me, other)
+                Message.objects.create(conversation=conversation, sender=other, content='unread')
+                Message.objects.create(conversation=conversation, sender=other, content='unread')
+                Message.objects.create(conversation=conversation, sender=me, content='latest')
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('messages'))
+            return len(queries), response
+
+        few, _ = start_conversations(2)
+        many, response = start_conversations(20)
+        self.assertEqual(few, many)
+        first = response.context['conversations'][0]
+        self.assertEqual((first.unread_count, first.last_message), (2, 'latest'))
+        self.assertEqual(first.other_username, 'other22')
+
+
+class MessageHistoryTests(TestCase):
+    def test_older_pages_walk_back_to_the_first_message(self):
+        alice = User.objects.create_user('alice', password='pw')
+        bob = User.objects.create_user('bob', password='pw')
+        conversation = Conversation.objects.create()
+        conversation.participants.add(alice, bob)
+        sent = [
+            Message.objects.create(conversation=conversation, sender=alice, content=str(i)).id
+            for i in range(70)
+        ]
+        self.client.force_login(bob)
+
+        response = self.client.get(reverse('conversation', args=[conversation.id]))
+        received = [message.id for message in response.context['messages']]
+        cursor = response.context['older_cursor']
+        while cursor:
+            data = self.client.get(reverse('older_messages', args=[conversation.id]), {'before': cursor}).json()
+            received = [message['id'] for message in data['messages']] + received
+            cursor = data['older_cursor']
+        self.assertEqual(received, sent)
+
+    def test_bad_cursor_is_rejected(self):
+        alice = User.objects.create_user('alice', password='pw')
+        conversation = Conversation.objects.create()
+        conversation.participants.add(alice)
+        self.client.force_login(alice)
+        response = self.client.get(reverse('older_messages', args=[conversation.id]), {'before': 'junk'})
+        self.assertEqual(response.status_code, 400)
+
+
+class FanOutTests(TestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(f'user{i}', password='pw') for i in range(5)]
+        self.user_ids = [user.id for user in self.users]
+
+    def test_batches_create_one_notification_per_recipient(self):
+        with mock.patch('accounts.notifications.NOTIFICATION_BATCH_SIZE', 2):
+            self.assertEqual(fan_out(self.user_ids + self.user_ids[:2], 'system', 'Title', 'Message'), 5)
+        self.assertEqual(sorted(Notification.objects.values_list('user_id', flat=True)), self.user_ids)
+        self.assertEqual(set(Profile.objects.values_list('unread_notifications', flat=True)), {1})
+
+    def test_application_updates_opt_out(self):
+        Profile.objects.filter(user=self.users[0]).update(application_updates=False)
+        self.assertEqual(fan_out(self.user_ids, 'event', 'Event cancelled', 'Message'), 4)
+        self.assertFalse(Notification.objects.filter(user=self.users[0]).exists())
+        self.assertEqual(self.users[0].profile.unread_notifications, 0)
+        # System notices are not covered by the opt-out
+        self.assertEqual(fan_out(self.user_ids, 'system', 'Maintenance', 'Message'), 5)
+
+
+@override_settings(REALTIME_BROKER='accounts.realtime.DatabaseBroker')
+class DatabaseBrokerTests(TestCase):
+    def setUp(self):
+        realtime.get_broker.cache_clear()
+        self.addCleanup(realtime.get_broker.cache_clear)
+        self.users = [User.objects.create_user(f'user{i}', password='pw') for i in range(3)]
+
+    def test_fan_out_publishes_in_one_insert(self):
+        user_ids = [user.id for user in self.users]
+        with self.captureOnCommitCallbacks() as callbacks:
+            fan_out(user_ids, 'system', 'Title', 'Message')
+        with self.assertNumQueries(1):
+            for callback in callbacks:
+                callback()
+        self.assertEqual(sorted(RealtimeEvent.objects.values_list('user_id', flat=True)), user_ids)
+
+    def test_prune_keeps_events_inside_retention(self):
+        realtime.publish([self.users[0].id], {'type': 'old'})
+        realtime.publish([self.users[0].id], {'type': 'new'})
+        RealtimeEvent.objects.filter(payload__type='old').update(
+            created_at=timezone.now() - timedelta(seconds=realtime.RETENTION_SECONDS + 1)
+        )
+        self.assertEqual(realtime.prune_events(), 1)
+        self.assertEqual([event.payload['type'] for event in RealtimeEvent.objects.all()], ['new'])
+
+
+class AvailabilityUpdateTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('performer', password='pw')
+        self.today = timezone.now().date()
+        self.client.force_login(self.user)
+
+    def rule(self, weekday, start, valid_from):
+        return AvailabilityRule.objects.create(
+            user=self.user, weekday=weekday, start_time=time(start), end_time=time(start + 2), valid_from=valid_from,
+        )
+
+    def submit(self, *rows):
+        data = {'days[]': [], 'dates[]': [], 'start_times[]': [], 'end_times[]': [],
+                'is_available[]': [], 'is_recurring[]': [], 'notes[]': []}
+        for weekday, start in rows:
+            data['days[]'].append(str(weekday))
+            data['dates[]'].append('')
+            data['start_times[]'].append(f'{start:02d}:00')
+            data['end_times[]'].append(f'{start + 2:02d}:00')
+            data['is_available[]'].append('true')
+            data['is_recurring[]'].append('true')
+            data['notes[]'].append('')
+        return self.client.post(reverse('update_availability'), data)
+
+    def test_dropped_rules_end_yesterday_and_unchanged_rules_are_kept(self):
+        month_ago = self.today - timedelta(days=28)
+        kept = self.rule(month_ago.weekday(), 10, month_ago)
+        dropped = self.rule(month_ago.weekday(), 18, month_ago)
+        unstarted = self.rule(month_ago.weekday(), 14, self.today)
+
+        self.assertEqual(self.submit((kept.weekday, 10), (2, 9)).status_code, 200)
+        kept.refresh_from_db()
+        dropped.refresh_from_db()
+        self.assertEqual((kept.valid_from, kept.valid_until), (month_ago, None))
+        self.assertEqual(dropped.valid_until, self.today - timedelta(days=1))
+        self.assertFalse(AvailabilityRule.objects.filter(id=unstarted.id).exists())
+        self.assertTrue(AvailabilityRule.objects.filter(weekday=2, start_time=time(9), valid_from=self.today).exists())
+
+        # Past weeks still show the dropped evening slot; future ones don't
+        past = {slot[1] for slot in occurrences(self.user, month_ago, self.today)}
+        future = {slot[1] for slot in occurrences(self.user, self.today, self.today + timedelta(days=28))}
+        self.assertEqual(past, {time(10), time(18)})
+        self.assertEqual(future, {time(10), time(9)})
@@ -11,8 +11,11 @@ urlpatterns = [
     path('messages/', views.messages_view, name='messages'),
     path('messages/<int:conversation_id>/', views.conversation_view, name='conversation'),
     path('messages/<int:conversation_id>/send/', views.send_message, name='send_message'),
+    path('messages/<int:conversation_id>/older/', views.older_messages, name='older_messages'),
     path('messages/start/<int:user_id>/', views.start_conversation, name='start_conversation'),
     path('notifications/', views.notifications_view, name='notifications'),
+    path('notifications/read-all/', views.mark_all_notifications_read, name='mark_all_notifications_read'),
+    path('stream/', views.event_stream, name='event_stream'),
     path('calendar/availability/', views.update_availability, name='update_availability'),
     path('calendar/events/add/', views.add_calendar_event, name='add_calendar_event'),
     path('calendar/events/<int:event_id>/delete/', views.delete_calendar_event, name='delete_calendar_event'),
@@ -2,14 +2,34 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.http import JsonResponse
-from django.db.models import Q
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth import login, authenticate
 from .forms import CustomSignupForm
-from .models import Profile, Conversation, Message, Notification, CalendarEvent
-from home.models import Event, EventApplication, Availability
+from .models import Conversation, Message, Notification, CalendarEvent
+from . import agenda, counters, realtime
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+import json
+from home.models import Event, EventApplication, Availability, AvailabilityException, AvailabilityRule
+from campusbooking.db_router import replica_reads
+from home import timeline
+from home.availability import availability_blocks
+from home.pagination import decode_cursor, encode_cursor, paginate
 from django.utils import timezone
-from types import SimpleNamespace
+from datetime import datetime, timedelta
+
+INBOX_PAGE_SIZE = 20
+CONVERSATION_PAGE_SIZE = 30
+MESSAGE_ORDERING = ('created_at', 'id')
+MESSAGE_CURSOR_PARSERS = (datetime.fromisoformat, int)
+# Seconds between comment lines that keep idle event streams open
+STREAM_KEEPALIVE_SECONDS = 15
+# Days of upcoming availability listed on a profile
+AVAILABILITY_PREVIEW_DAYS = 28
 
 # Create your views here.
 
@@ -40,12 +60,8 @@ def signup(request):
 
 @login_required
 def dashboard(request):
-    # Ensure user has a profile
-    if not hasattr(request.user, 'profile'):
-        Profile.objects.create(user=request.user)
-    
     # Get the active tab from the request, defaulting based on user role
-    active_tab = request.GET.get('tab', 'events' if request.user.profile.role == 'organizer' else 'applications')
+    active_tab = request.GET.get('tab', 'events' if request.is_organizer else 'applications')
     
     context = {
         'active_tab': active_tab,
@@ -63,7 +79,7 @@ def dashboard(request):
         ).order_by('-created_at')
     
     elif active_tab == 'requests':
-        if request.user.profile.role == 'performer':
+        if request.is_performer:
             context['requests'] = EventApplication.objects.filter(
                 performer=request.user
             ).select_related('event').order_by('-created_at')
@@ -74,10 +90,7 @@ def dashboard(request):
     
     elif active_tab == 'messages':
         context['conversations'] = request.user.conversations.all()
-        context['unread_count'] = Message.objects.filter(
-            conversation__participants=request.user,
-            is_read=False
-        ).exclude(sender=request.user).count()
+        context['unread_count'] = request.user.profile.unread_messages
     
     elif active_tab == 'profile':
         if request.method == 'POST':
@@ -99,7 +112,8 @@ def dashboard(request):
             
             request.user.save()
             request.user.profile.bio = bio
-            request.user.profile.save()
+            # Only the edited columns: a full save would write back stale unread counters
+            request.user.profile.save(update_fields=['bio', 'updated_at'])
             
             messages.success(request, 'Profile updated successfully.')
             return redirect('dashboard')
@@ -113,7 +127,9 @@ def dashboard(request):
             request.user.profile.email_notifications = email_notifications
             request.user.profile.application_updates = application_updates
             request.user.profile.show_profile = show_profile
-            request.user.profile.save()
+            request.user.profile.save(update_fields=[
+                'email_notifications', 'application_updates', 'show_profile', 'updated_at'
+            ])
             
             messages.success(request, 'Settings updated successfully.')
             return redirect('dashboard')
@@ -122,32 +138,80 @@ def dashboard(request):
 
 @login_required
 def messages_view(request):
-    conversations = Conversation.objects.filter(participants=request.user).order_by('-updated_at')
-    for conversation in conversations:
-        conversation.other_user = conversation.participants.exclude(id=request.user.id).first()
-        # Get unread count for each conversation
-        conversation.unread_count = Message.objects.filter(
-            conversation=conversation,
-            is_read=False
-        ).exclude(sender=request.user).count()
+    # The other participant, last message and unread count come back as
+    # annotations on the page query rather than as extra queries per row.
+    other_participants = User.objects.filter(conversations=OuterRef('pk')).exclude(id=request.user.id)
+    last_message = Message.objects.filter(conversation=OuterRef('pk')).order_by('-created_at', '-id')
+    unread_messages = Message.objects.filter(
+        conversation=OuterRef('pk'),
+        is_read=False
+    ).exclude(sender=request.user).order_by().values('conversation').annotate(count=Count('id')).values('count')
+
+    conversations = Conversation.objects.filter(participants=request.user).annotate(
+        other_username=Subquery(other_participants.values('username')[:1]),
+        last_message=Subquery(last_message.values('content')[:1]),
+        unread_count=Coalesce(Subquery(unread_messages), 0),
+    ).order_by('-updated_at')
+
+    page_obj = Paginator(conversations, INBOX_PAGE_SIZE).get_page(request.GET.get('page'))
     return render(request, 'accounts/messages.html', {
-        'conversations': conversations
+        'conversations': page_obj,
+        'page_obj': page_obj,
     })
 
 @login_required
 def conversation_view(request, conversation_id):
     conversation = get_object_or_404(Conversation, id=conversation_id, participants=request.user)
-    messages = conversation.messages.all().order_by('created_at')
     other_user = conversation.participants.exclude(id=request.user.id).first()
     
     # Mark unread messages as read
-    unread_messages = messages.filter(is_read=False).exclude(sender=request.user)
-    unread_messages.update(is_read=True)
+    marked = conversation.messages.filter(is_read=False).exclude(sender=request.user).update(is_read=True)
+    counters.adjust_unread_messages([request.user.id], -marked)
+
+    # Render only the newest page; older pages are fetched by cursor from
+    # older_messages as the user scrolls back.
+    messages, older_values = paginate(
+        conversation.messages.all(),
+        MESSAGE_ORDERING,
+        page_size=CONVERSATION_PAGE_SIZE,
+        descending=True,
+    )
+    messages.reverse()
     
     return render(request, 'accounts/conversation.html', {
         'conversation': conversation,
         'messages': messages,
-        'other_user': other_user
+        'other_user': other_user,
+        'older_cursor': encode_cursor(older_values) if older_values else None,
+    })
+
+@login_required
+def older_messages(request, conversation_id):
+    conversation = get_object_or_404(Conversation, id=conversation_id, participants=request.user)
+    cursor_values = decode_cursor(request.GET.get('before'), MESSAGE_CURSOR_PARSERS)
+    if cursor_values is None:
+        return JsonResponse({'status': 'error'}, status=400)
+
+    messages, older_values = paginate(
+        conversation.messages.all(),
+        MESSAGE_ORDERING,
+        cursor_values,
+        CONVERSATION_PAGE_SIZE,
+        descending=True,
+    )
+    messages.reverse()
+    return JsonResponse({
+        'status': 'success',
+        'messages': [
+            {
+                'id': message.id,
+                'content': message.content,
+                'created_at': message.created_at.isoformat(),
+                'is_mine': message.sender_id == request.user.id,
+            }
+            for message in messages
+        ],
+        'older_cursor': encode_cursor(older_values) if older_values else None,
     })
 
 @login_required
@@ -172,6 +236,35 @@ def send_message(request, conversation_id):
             })
     return JsonResponse({'status': 'error'}, status=400)
 
+async def event_stream(request):
+    # Server-Sent Events stream of new messages and notifications for the
+    # signed-in user. Needs an ASGI server to hold connections open cheaply.
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI the endless stream would be buffered on a thread forever.
+        # 204 tells EventSource not to reconnect; pages still work without it.
+        return HttpResponse(status=204)
+    user_id = await sync_to_async(lambda: request.user.pk if request.user.is_authenticated else None)()
+    if user_id is None:
+        return HttpResponse(status=401)
+
+    response = StreamingHttpResponse(_stream_events(user_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+async def _stream_events(user_id):
+    subscription = realtime.get_broker().subscribe(user_id)
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            event = await subscription.get(STREAM_KEEPALIVE_SECONDS)
+            if event is None:
+                yield ': keepalive\n\n'
+            else:
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        await subscription.close()
+
 @login_required
 def start_conversation(request, user_id):
     other_user = get_object_or_404(User, id=user_id)
@@ -194,26 +287,25 @@ def start_conversation(request, user_id):
 
 @login_required
 def notifications_view(request):
-    notifications = request.user.notifications.all()
-    unread_count = notifications.filter(is_read=False).count()
-    
     if request.method == 'POST':
         notification_id = request.POST.get('notification_id')
         if notification_id:
             notification = get_object_or_404(Notification, id=notification_id, user=request.user)
-            notification.is_read = True
-            notification.save()
+            # Only count the transition from unread to read
+            marked = Notification.objects.filter(id=notification.id, is_read=False).update(is_read=True)
+            counters.adjust_unread_notifications([request.user.id], -marked)
             return JsonResponse({'status': 'success'})
     
     return render(request, 'accounts/notifications.html', {
-        'notifications': notifications,
-        'unread_count': unread_count
+        'notifications': request.user.notifications.all(),
+        'unread_count': request.user.profile.unread_notifications
     })
 
 @login_required
 def mark_all_notifications_read(request):
     if request.method == 'POST':
-        request.user.notifications.filter(is_read=False).update(is_read=True)
+        marked = request.user.notifications.filter(is_read=False).update(is_read=True)
+        counters.adjust_unread_notifications([request.user.id], -marked)
         return JsonResponse({'status': 'success'})
     return JsonResponse({'status': 'error'}, status=400)
 
@@ -238,7 +330,7 @@ def update_profile(request):
         
         request.user.save()
         request.user.profile.bio = bio
-        request.user.profile.save()
+        request.user.profile.save(update_fields=['bio', 'updated_at'])
         
         messages.success(request, 'Profile updated successfully.')
     
@@ -246,49 +338,83 @@ def update_profile(request):
 
 @login_required
 def update_availability(request):
+    """Replace the user's weekly availability and upcoming one-off slots.
+
+    Recurring rows become one AvailabilityRule each; dated rows become one-off
+    slots, or exceptions when marked unavailable. Rules that are dropped end
+    yesterday rather than being deleted, so past weeks keep their availability;
+    unchanged rules are left as they are.
+    """
     if request.method == 'POST':
         try:
-            # Delete existing availabilities
-            Availability.objects.filter(user=request.user).delete()
-            
-            # Get availability data from request
             days = request.POST.getlist('days[]')
             dates = request.POST.getlist('dates[]')
             start_times = request.POST.getlist('start_times[]')
             end_times = request.POST.getlist('end_times[]')
             is_available = request.POST.getlist('is_available[]')
             is_recurring = request.POST.getlist('is_recurring[]')
-            
-            # Create new availabilities
+            notes = request.POST.getlist('notes[]')
+            today = timezone.now().date()
+
+            rules, slots, exceptions = [], [], []
             for i in range(len(start_times)):
                 if not start_times[i] or not end_times[i]:
                     continue
-                    
+                start_time = datetime.strptime(start_times[i], '%H:%M').time()
+                end_time = datetime.strptime(end_times[i], '%H:%M').time()
+                if end_time <= start_time:
+                    raise ValueError('End time must be after start time.')
+                available = is_available[i] == 'true'
+                note = notes[i] if i < len(notes) else ''
+
                 if is_recurring[i] == 'true':
-                    # Create recurring availability
-                    if not days[i]:
+                    # Weekly unavailability is simply the absence of a rule
+                    if not days[i] or not available:
                         continue
-                    Availability.objects.create(
+                    rules.append(AvailabilityRule(
                         user=request.user,
-                        day_of_week=int(days[i]),
-                        start_time=start_times[i],
-                        end_time=end_times[i],
-                        is_available=is_available[i] == 'true',
-                        is_recurring=True
-                    )
+                        weekday=int(days[i]),
+                        start_time=start_time,
+                        end_time=end_time,
+                        valid_from=today,
+                        note=note
+                    ))
                 else:
-                    # Create date-based availability
                     if not dates[i]:
                         continue
-                    Availability.objects.create(
+                    model = Availability if available else AvailabilityException
+                    (slots if available else exceptions).append(model(
                         user=request.user,
-                        date=dates[i],
-                        start_time=start_times[i],
-                        end_time=end_times[i],
-                        is_available=is_available[i] == 'true',
-                        is_recurring=False
-                    )
-            
+                        date=datetime.strptime(dates[i], '%Y-%m-%d').date(),
+                        start_time=start_time,
+                        end_time=end_time,
+                        note=note
+                    ))
+
+            with transaction.atomic():
+                submitted = {(rule.weekday, rule.start_time, rule.end_time, rule.note): rule for rule in rules}
+                ended, unstarted = [], []
+                current = AvailabilityRule.objects.select_for_update().filter(
+                    Q(valid_until__isnull=True) | Q(valid_until__gte=today),
+                    user=request.user
+                )
+                for rule in current:
+                    key = (rule.weekday, rule.start_time, rule.end_time, rule.note)
+                    if submitted.pop(key, None) is None:
+                        (ended if rule.valid_from < today else unstarted).append(rule.id)
+                AvailabilityRule.objects.filter(id__in=ended).update(
+                    valid_until=today - timedelta(days=1),
+                    updated_at=timezone.now()
+                )
+                AvailabilityRule.objects.filter(id__in=unstarted).delete()
+                AvailabilityException.objects.filter(user=request.user, date__gte=today).delete()
+                Availability.objects.filter(user=request.user, date__gte=today).delete()
+                AvailabilityRule.objects.bulk_create(submitted.values())
+                AvailabilityException.objects.bulk_create(exceptions)
+                # Duplicate rows (or ones matching kept past slots) are skipped
+                Availability.objects.bulk_create(slots, ignore_conflicts=True)
+                timeline.sync_user_availability(request.user.id)
+
             return JsonResponse({'status': 'success'})
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
@@ -342,9 +468,6 @@ def delete_calendar_event(request, event_id):
     except CalendarEvent.DoesNotExist:
         return JsonResponse({'status': 'error'}, status=404)
 
-def notifications_view(request):
-    return render(request, 'accounts/notifications.html')
-
 def support_view(request):
     return render(request, 'accounts/support.html')
 
@@ -361,54 +484,20 @@ def privacy_view(request):
     return render(request, 'accounts/privacy.html')
 
 @login_required
+@replica_reads
 def user_profile(request, username):
-    profile_user = get_object_or_404(User, username=username)
-    availabilities = Availability.objects.filter(user=profile_user)
-    calendar_events = CalendarEvent.objects.filter(
-        user=profile_user,
-        date__gte=timezone.now().date()
-    )
-    upcoming_events = list(calendar_events)
-    if hasattr(profile_user, 'profile') and profile_user.profile.role == 'organizer':
-        # Add upcoming events organized by this user
-        org_events = Event.objects.filter(
-            organizer=profile_user,
-            date__gte=timezone.now().date(),
-            status='published'
-        )
-        for event in org_events:
-            # Avoid duplicates if already in calendar_events
-            if not any(getattr(e, 'related_event_id', None) == event.id for e in calendar_events):
-                upcoming_events.append(SimpleNamespace(
-                    title=event.title,
-                    date=event.date,
-                    start_time=event.start_time,
-                    end_time=event.end_time,
-                    location=getattr(event, 'venue', None),
-                ))
-    else:
-        # Performer: add accepted performer events
-        accepted_applications = EventApplication.objects.filter(
-            performer=profile_user,
-            status='accepted',
-            event__date__gte=timezone.now().date()
-        ).select_related('event')
-        performer_events = [app.event for app in accepted_applications]
-        for event in performer_events:
-            if not any(getattr(e, 'related_event_id', None) == event.id for e in calendar_events):
-                upcoming_events.append(SimpleNamespace(
-                    title=event.title,
-                    date=event.date,
-                    start_time=event.start_time,
-                    end_time=event.end_time,
-                    location=getattr(event, 'venue', None),
-                ))
-    upcoming_events.sort(key=lambda e: (e.date, e.start_time))
+    profile_user = get_object_or_404(User.objects.select_related('profile'), username=username)
+    today = timezone.now().date()
+    # Recurring availability is expanded only over the preview window
+    availabilities = list(availability_blocks(
+        profile_user, today, today + timedelta(days=AVAILABILITY_PREVIEW_DAYS)
+    ))
+    role = profile_user.profile.role if hasattr(profile_user, 'profile') else None
     context = {
         'profile_user': profile_user,
         'availabilities': availabilities,
-        'upcoming_events': upcoming_events,
-        'now': timezone.now().date(),
+        'upcoming_events': agenda.upcoming(profile_user, role, start=today),
+        'now': today,
     }
     return render(request, 'accounts/user_profile.html', context)
 
@@ -0,0 +1,85 @@
+"""Primary/replica routing for read-heavy views.
+
+Writes always go to ``default``. Reads go to ``default`` too unless the view
+is wrapped in ``replica_reads``, in which case they go to a random alias from
+``settings.REPLICA_DATABASES``. Reads stay on the primary when:
+
+- the request is not GET/HEAD, or is inside a transaction on the primary;
+- the request has already written something;
+- the client wrote within the last ``REPLICA_PIN_SECONDS``, tracked by a
+  cookie that ``ReadYourWritesMiddleware`` sets, so users see their own
+  changes while replicas catch up.
+"""
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'db_pin'
+
+# Whether reads in the current request may use a replica
+_replica_reads = ContextVar('replica_reads', default=False)
+# Set once the current request writes, pinning its remaining reads
+_wrote = ContextVar('wrote', default=False)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.REPLICA_DATABASES
+        if (
+            replicas
+            and _replica_reads.get()
+            and not _wrote.get()
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return random.choice(replicas)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def replica_reads(view):
+    """Let ``view`` read from a replica unless the client is pinned to the primary."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        allowed = request.method in ('GET', 'HEAD') and PIN_COOKIE not in request.COOKIES
+        token = _replica_reads.set(allowed)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+    return wrapper
+
+
+class ReadYourWritesMiddleware:
+    """Pin a client to the primary for a while after a request that wrote."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            wrote = _wrote.get()
+        finally:
+            _wrote.reset(token)
+        if settings.REPLICA_DATABASES and (wrote or request.method not in ('GET', 'HEAD', 'OPTIONS')):
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+from dotenv import load_dotenv
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -20,7 +24,16 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-s34iia^_!3osnr%mkt@)xv#sy#=y89lwh+fbx-!%2%q62g$x3s'
+# It signs session cookies and calendar feed tokens, so it comes from the
+# environment (or a local, untracked .env file) and never from the repo.
+load_dotenv(BASE_DIR / '.env')
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY')
+if not SECRET_KEY:
+    raise ImproperlyConfigured(
+        'Set DJANGO_SECRET_KEY in the environment or in .env, e.g. to the output of '
+        '`python -c "from django.core.management.utils import get_random_secret_key; '
+        'print(get_random_secret_key())"`.'
+    )
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
@@ -43,14 +56,17 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'accounts',
     'home',
+    'jobs',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'campusbooking.db_router.ReadYourWritesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.UserRoleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -68,6 +84,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'accounts.context_processors.roles',
             ],
         },
     },
@@ -86,6 +103,27 @@ DATABASES = {
     }
 }
 
+# Read replicas
+# DATABASE_REPLICAS lists replica SQLite files, comma-separated, e.g. copies
+# of db.sqlite3 kept in sync by Litestream or a cron'd `.backup`. Views
+# wrapped in campusbooking.db_router.replica_reads read from them; everything
+# else, and any client that wrote in the last REPLICA_PIN_SECONDS, uses
+# 'default'. Tests mirror the replicas onto 'default'.
+
+for index, path in enumerate(filter(None, os.environ.get('DATABASE_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica_{index}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != 'default']
+REPLICA_PIN_SECONDS = 10
+DATABASE_ROUTERS = ['campusbooking.db_router.PrimaryReplicaRouter']
+
+
+# Loads the user's Profile together with the user on every request
+AUTHENTICATION_BACKENDS = ['accounts.backends.ProfileModelBackend']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -131,6 +169,51 @@ STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache
+# Holds rendered template fragments (event cards, event detail sections),
+# keyed on version stamps so entries never need deleting. Local memory is
+# per process; point this at a shared backend (e.g. Redis or Memcached) when
+# running several workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'campusbooking',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+
+# Sessions
+# Sessions live in a signed cookie, so reading one costs no database query
+# and logging in or out takes no lock on the SQLite file. The cookie is
+# signed with SECRET_KEY (see above). Sessions only hold the login, so the
+# cookie stays small. Use 'django.contrib.sessions.backends.
+# cached_db' instead to keep sessions server-side (e.g. to revoke them):
+# reads then come from CACHES (which must be shared between workers) and
+# writes go through to the database.
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.signed_cookies'
+# Only write a session when it changed
+SESSION_SAVE_EVERY_REQUEST = False
+# Flash messages ride in their own cookie rather than the session
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# Real-time push
+# DatabaseBroker relays events through the database, so notifications created
+# by the job worker reach streams held by the web workers, at up to a second
+# of delay. 'accounts.realtime.RedisBroker' with REALTIME_REDIS_URL does the
+# same without polling. InProcessBroker only reaches streams in the
+# publishing process and is unsuitable once a job worker runs.
+
+REALTIME_BROKER = 'accounts.realtime.DatabaseBroker'
+
+# Background jobs
+# Jobs are stored in the database and processed by `manage.py run_worker`.
+# Set JOBS_EAGER to run them in-process after the request's transaction
+# commits instead, e.g. in development without a worker.
+
+JOBS_EAGER = False
+
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'landing_page'
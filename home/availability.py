@@ -0,0 +1,104 @@
+"""Availability as stored rules, expanded into concrete slots on read.
+
+A user's availability is the union of weekly ``AvailabilityRule`` rows and
+one-off ``Availability`` slots (read through their TimelineEntry mirror),
+minus ``AvailabilityException`` dates. Rules are never materialised:
+``occurrences`` walks only the requested window, so a weekly slot costs one
+row however far ahead the calendar is browsed.
+"""
+import heapq
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Q
+
+from .models import AvailabilityException, AvailabilityRule, TimelineEntry
+
+
+def merge_intervals(slots):
+    """Merge overlapping or touching ``(date, start, end, ...)`` slots.
+
+    ``slots`` must be sorted by ``(date, start)``. Yields ``(date, start, end,
+    members)`` where ``members`` are the original slots folded into the block.
+    """
+    current = None
+    for slot in slots:
+        day, start, end = slot[0], slot[1], slot[2]
+        if current and current[0] == day and start <= current[2]:
+            current[2] = max(current[2], end)
+            current[3].append(slot)
+        else:
+            if current:
+                yield tuple(current)
+            current = [day, start, end, [slot]]
+    if current:
+        yield tuple(current)
+
+
+def _cancelled(exceptions, start, end):
+    for exc_start, exc_end in exceptions:
+        if exc_start is None or exc_end is None:
+            return True
+        if exc_start < end and start < exc_end:
+            return True
+    return False
+
+
+def expand_rules(rules, exceptions, start, end):
+    """Yield ``(date, start, end, key, note)`` for rule occurrences in ``[start, end)``.
+
+    ``exceptions`` maps a date to its ``(start_time, end_time)`` pairs.
+    Occurrences come out sorted by date and start time.
+    """
+    by_weekday = defaultdict(list)
+    for rule in sorted(rules, key=lambda rule: rule.start_time):
+        by_weekday[rule.weekday].append(rule)
+
+    day = start
+    while day < end:
+        for rule in by_weekday.get(day.weekday(), ()):
+            if day < rule.valid_from or (rule.valid_until and day > rule.valid_until):
+                continue
+            if _cancelled(exceptions.get(day, ()), rule.start_time, rule.end_time):
+                continue
+            yield (day, rule.start_time, rule.end_time, f'rule-{rule.id}-{day}', rule.note)
+        day += timedelta(days=1)
+
+
+def occurrences(user, start, end):
+    """Yield every available ``(date, start, end, key, note)`` slot in ``[start, end)``.
+
+    Sorted by date and start time, ready for ``merge_intervals``.
+    """
+    rules = AvailabilityRule.objects.filter(
+        Q(valid_until__isnull=True) | Q(valid_until__gte=start),
+        user=user,
+        valid_from__lt=end,
+    )
+    exceptions = defaultdict(list)
+    for day, exc_start, exc_end in AvailabilityException.objects.filter(
+        user=user, date__gte=start, date__lt=end
+    ).values_list('date', 'start_time', 'end_time'):
+        exceptions[day].append((exc_start, exc_end))
+    # One-off slots are mirrored into the timeline, with the note as title
+    one_offs = (
+        (day, slot_start, slot_end, f'slot-{slot_id}', note)
+        for day, slot_start, slot_end, slot_id, note in TimelineEntry.objects
+        .filter(user=user, kind='availability', date__gte=start, date__lt=end)
+        .order_by('date', 'start_time')
+        .values_list('date', 'start_time', 'end_time', 'source_id', 'title')
+    )
+    return heapq.merge(expand_rules(rules, exceptions, start, end), one_offs, key=lambda slot: slot[:2])
+
+
+def availability_blocks(user, start, end):
+    """Yield merged availability blocks for ``user`` in ``[start, end)`` as dicts."""
+    for day, block_start, block_end, members in merge_intervals(occurrences(user, start, end)):
+        notes = list(dict.fromkeys(slot[4] for slot in members if slot[4]))
+        yield {
+            'key': members[0][3],
+            'date': day,
+            'start_time': block_start,
+            'end_time': block_end,
+            'note': ', '.join(notes),
+        }
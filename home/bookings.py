@@ -0,0 +1,78 @@
+"""Double-booking checks for performers.
+
+A performer is booked by accepted applications to published events and by
+their own calendar entries. Bookings are only loaded for the dates being
+checked, through the ``(performer, status)`` and ``(user, date, start_time)``
+indexes, so the cost doesn't grow with a performer's history. Within a day
+they are kept in an ``IntervalIndex`` that answers overlap queries by
+bisection.
+"""
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from accounts.models import CalendarEvent
+
+from .models import EventApplication
+
+
+class IntervalIndex:
+    """Per-performer, per-day intervals supporting O(log n) overlap checks.
+
+    Each bucket keeps intervals sorted by start time alongside the running
+    maximum of their end times: an interval ``[start, end)`` overlaps the
+    bucket iff some booking starting before ``end`` finishes after ``start``,
+    i.e. iff that prefix maximum exceeds ``start``.
+    """
+
+    def __init__(self):
+        self._days = defaultdict(lambda: ([], []))
+
+    def add(self, performer_id, day, start, end, label):
+        intervals, max_ends = self._days[(performer_id, day)]
+        insort(intervals, (start, end, label))
+        # Running maxima only change from the insertion point onwards
+        i = bisect_left(intervals, (start, end, label))
+        max_ends[i:] = []
+        running = max_ends[-1] if max_ends else None
+        for interval in intervals[i:]:
+            running = interval[1] if running is None else max(running, interval[1])
+            max_ends.append(running)
+
+    def conflict(self, performer_id, day, start, end):
+        """Return the label of a booking overlapping ``[start, end)``, or None."""
+        intervals, max_ends = self._days.get((performer_id, day), ((), ()))
+        k = bisect_left(intervals, (end,))
+        if not k or max_ends[k - 1] <= start:
+            return None
+        # Walk back to the booking that set the maximum; usually the nearest
+        for interval in reversed(intervals[:k]):
+            if interval[1] > start:
+                return interval[2]
+        return None
+
+
+def booking_index(performer_ids, dates, exclude_event=None):
+    """Build an IntervalIndex of the performers' bookings on the given dates.
+
+    Bookings tied to ``exclude_event`` are left out, so accepting a second
+    role at the same event isn't reported as a clash with itself.
+    """
+    index = IntervalIndex()
+    # Like the timeline, only published events count as bookings
+    accepted = EventApplication.objects.filter(
+        performer_id__in=performer_ids, status='accepted', event__status='published', event__date__in=dates
+    )
+    calendar = CalendarEvent.objects.filter(user_id__in=performer_ids, date__in=dates)
+    if exclude_event is not None:
+        accepted = accepted.exclude(event=exclude_event)
+        calendar = calendar.exclude(related_event=exclude_event)
+
+    for performer_id, day, start, end, title in accepted.values_list(
+        'performer_id', 'event__date', 'event__start_time', 'event__end_time', 'event__title'
+    ):
+        index.add(performer_id, day, start, end, title)
+    for performer_id, day, start, end, title in calendar.values_list(
+        'user_id', 'date', 'start_time', 'end_time', 'title'
+    ):
+        index.add(performer_id, day, start, end, title)
+    return index
@@ -0,0 +1,296 @@
+"""Bulk import of categories, venues, events and talent needs.
+
+Rows are streamed from CSV or JSON Lines and written in batches: each batch
+resolves its foreign keys through in-memory lookup maps (filled with one
+query per batch for keys not seen before), then inserts new rows with
+``bulk_create`` and, when upserting, rewrites existing ones with
+``bulk_update``, all inside one transaction. Rows are matched to existing
+records by natural key:
+
+- categories: ``name``
+- venues: ``name`` + ``city``
+- events: ``organizer`` (username) + ``title`` + ``date`` + ``start_time``
+- talent: the event's key (``organizer``, ``title``, ``date``, ``start_time``)
+  + ``talent_type``
+
+Bulk writes send no signals, so the search index and timelines of imported
+events are refreshed once the import finishes.
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_time
+
+from . import reference, search, timeline
+from .models import Category, Event, EventTalent, Venue
+
+KINDS = ('categories', 'venues', 'events', 'talent')
+DEFAULT_BATCH_SIZE = 1000
+
+
+class RowError(ValueError):
+    pass
+
+
+@dataclass
+class ImportStats:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    errors: list = field(default_factory=list)
+    event_ids: set = field(default_factory=set)
+
+
+def read_rows(stream, fmt):
+    """Yield one dict per input row of a CSV or JSON Lines stream."""
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+    else:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def _text(row, key, required=True):
+    value = row.get(key)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise RowError(f'missing {key}')
+    return value
+
+
+def _date(row, key):
+    value = parse_date(_text(row, key))
+    if value is None:
+        raise RowError(f'invalid {key}')
+    return value
+
+
+def _time(row, key):
+    value = parse_time(_text(row, key))
+    if value is None:
+        raise RowError(f'invalid {key}')
+    return value.replace(microsecond=0)
+
+
+def _event_key(row, organizer_ids):
+    username = _text(row, 'organizer')
+    if username not in organizer_ids:
+        raise RowError(f'unknown organizer {username}')
+    return (organizer_ids[username], _text(row, 'title'), _date(row, 'date'), _time(row, 'start_time'))
+
+
+class CatalogImporter:
+    def __init__(self, kind, update=False, batch_size=DEFAULT_BATCH_SIZE):
+        if kind not in KINDS:
+            raise ValueError(f'kind must be one of {", ".join(KINDS)}')
+        self.kind = kind
+        self.update = update
+        self.batch_size = batch_size
+        self.stats = ImportStats()
+        # Natural key -> id lookup maps shared by every batch
+        self.category_ids = {}
+        self.venue_ids = {}
+        self.organizer_ids = {}
+        self.reference_changed = False
+
+    def run(self, rows):
+        for batch in batched(rows, self.batch_size):
+            start = self.stats.rows
+            self.stats.rows += len(batch)
+            with transaction.atomic():
+                getattr(self, f'_import_{self.kind}')(list(enumerate(batch, start + 1)))
+        self._refresh_derived()
+        return self.stats
+
+    def _collect(self, numbered_rows, parse):
+        """Parse rows into ``{key: values}``; later duplicates of a key win."""
+        parsed = {}
+        for line, row in numbered_rows:
+            try:
+                key, values = parse(row)
+            except (RowError, ValueError, TypeError) as e:
+                self.stats.errors.append((line, str(e)))
+                continue
+            parsed[key] = values
+        return parsed
+
+    def _upsert(self, model, parsed, existing, fields):
+        """Create rows whose key is new and update changed ones if upserting."""
+        to_create, to_update = [], []
+        for key, values in parsed.items():
+            obj = existing.get(key)
+            if obj is None:
+                to_create.append(model(**values))
+            elif not self.update or all(getattr(obj, f) == values[f] for f in fields):
+                self.stats.unchanged += 1
+            else:
+                for f in fields:
+                    setattr(obj, f, values[f])
+                to_update.append(obj)
+        model.objects.bulk_create(to_create)
+        if to_update:
+            # bulk_update skips auto_now, but cached fragments are keyed on
+            # updated_at, so stamp it by hand
+            stamped = [f.name for f in model._meta.concrete_fields if getattr(f, 'auto_now', False)]
+            now = timezone.now()
+            for obj in to_update:
+                for name in stamped:
+                    setattr(obj, name, now)
+            model.objects.bulk_update(to_update, [*fields, *stamped])
+        self.stats.created += len(to_create)
+        self.stats.updated += len(to_update)
+        return to_create + to_update
+
+    # Lookup maps
+
+    def _load_categories(self, names):
+        missing = set(names) - self.category_ids.keys()
+        if missing:
+            self.category_ids.update(Category.objects.filter(name__in=missing).values_list('name', 'id'))
+            new = [Category(name=name) for name in missing - self.category_ids.keys()]
+            # Unknown categories referenced by events are created on the fly
+            for category in Category.objects.bulk_create(new):
+                self.category_ids[category.name] = category.id
+            self.reference_changed |= bool(new)
+
+    def _load_venues(self, keys):
+        missing = set(keys) - self.venue_ids.keys()
+        if missing:
+            for venue_id, name, city in Venue.objects.filter(
+                name__in={name for name, _ in missing}
+            ).values_list('id', 'name', 'city'):
+                self.venue_ids.setdefault((name, city), venue_id)
+
+    def _load_organizers(self, usernames):
+        missing = set(usernames) - self.organizer_ids.keys()
+        if missing:
+            self.organizer_ids.update(User.objects.filter(username__in=missing).values_list('username', 'id'))
+
+    # Kinds
+
+    def _import_categories(self, numbered_rows):
+        parsed = self._collect(numbered_rows, lambda row: (
+            _text(row, 'name'),
+            {'name': _text(row, 'name'), 'description': _text(row, 'description', required=False)},
+        ))
+        existing = {category.name: category for category in Category.objects.filter(name__in=parsed)}
+        for category in self._upsert(Category, parsed, existing, ['description']):
+            self.category_ids[category.name] = category.id
+            self.reference_changed = True
+
+    def _import_venues(self, numbered_rows):
+        def parse(row):
+            values = {f: _text(row, f) for f in ('name', 'address', 'city', 'state', 'zip_code')}
+            return (values['name'], values['city']), values
+
+        parsed = self._collect(numbered_rows, parse)
+        existing = {}
+        for venue in Venue.objects.filter(name__in={name for name, _ in parsed}):
+            existing.setdefault((venue.name, venue.city), venue)
+        for venue in self._upsert(Venue, parsed, existing, ['address', 'state', 'zip_code']):
+            self.venue_ids[(venue.name, venue.city)] = venue.id
+            self.reference_changed = True
+
+    def _import_events(self, numbered_rows):
+        rows = [row for _, row in numbered_rows]
+        self._load_organizers(_text(row, 'organizer', required=False) for row in rows)
+        self._load_categories(filter(None, (_text(row, 'category', required=False) for row in rows)))
+        self._load_venues(
+            (_text(row, 'venue', required=False), _text(row, 'venue_city', required=False))
+            for row in rows if _text(row, 'venue', required=False)
+        )
+
+        def parse(row):
+            key = _event_key(row, self.organizer_ids)
+            venue = (_text(row, 'venue', required=False), _text(row, 'venue_city', required=False))
+            if venue[0] and venue not in self.venue_ids:
+                raise RowError(f'unknown venue {venue[0]} ({venue[1]})')
+            status = _text(row, 'status', required=False) or 'draft'
+            if status not in dict(Event.STATUS_CHOICES):
+                raise RowError(f'invalid status {status}')
+            category = _text(row, 'category', required=False)
+            return key, {
+                'organizer_id': key[0],
+                'title': key[1],
+                'date': key[2],
+                'start_time': key[3],
+                'end_time': _time(row, 'end_time'),
+                'description': _text(row, 'description', required=False),
+                'category_id': self.category_ids[category] if category else None,
+                'venue_id': self.venue_ids[venue] if venue[0] else None,
+                'status': status,
+            }
+
+        parsed = self._collect(numbered_rows, parse)
+        existing = self._existing_events(parsed)
+        events = self._upsert(
+            Event, parsed, existing,
+            ['end_time', 'description', 'category_id', 'venue_id', 'status'],
+        )
+        self.stats.event_ids.update(event.id for event in events)
+
+    def _import_talent(self, numbered_rows):
+        self._load_organizers(_text(row, 'organizer', required=False) for _, row in numbered_rows)
+        event_keys = {}
+        for _, row in numbered_rows:
+            try:
+                event_keys[_event_key(row, self.organizer_ids)] = None
+            except (RowError, ValueError):
+                pass
+        event_ids = {key: event.id for key, event in self._existing_events(event_keys).items()}
+
+        def parse(row):
+            event_key = _event_key(row, self.organizer_ids)
+            if event_key not in event_ids:
+                raise RowError(f'unknown event {event_key[1]} on {event_key[2]}')
+            talent_type = _text(row, 'talent_type')
+            if talent_type not in dict(EventTalent.TALENT_TYPE_CHOICES):
+                raise RowError(f'invalid talent_type {talent_type}')
+            return (event_ids[event_key], talent_type), {
+                'event_id': event_ids[event_key],
+                'talent_type': talent_type,
+                'quantity_needed': int(_text(row, 'quantity_needed', required=False) or 1),
+                'description': _text(row, 'description', required=False),
+            }
+
+        parsed = self._collect(numbered_rows, parse)
+        existing = {}
+        for talent in EventTalent.objects.filter(event_id__in={key[0] for key in parsed}).order_by('id'):
+            existing.setdefault((talent.event_id, talent.talent_type), talent)
+        self._upsert(EventTalent, parsed, existing, ['quantity_needed', 'description'])
+
+    def _existing_events(self, keys):
+        existing = {}
+        candidates = Event.objects.filter(
+            organizer_id__in={key[0] for key in keys},
+            date__in={key[2] for key in keys},
+            title__in={key[1] for key in keys},
+        )
+        for event in candidates:
+            key = (event.organizer_id, event.title, event.date, event.start_time)
+            if key in keys:
+                existing.setdefault(key, event)
+        return existing
+
+    def _refresh_derived(self):
+        # Bulk writes skip the signal that invalidates cached dropdowns
+        if self.reference_changed:
+            reference.bump_version()
+        # Category and venue names are part of their keys, so only imported
+        # events can change what the search index and timelines hold.
+        if self.stats.event_ids:
+            search.index_events(self.stats.event_ids)
+            timeline.sync_events(self.stats.event_ids)
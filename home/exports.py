@@ -0,0 +1,63 @@
+"""Streaming CSV exports for organizers.
+
+Rows are read with a chunked iterator and written through a pseudo-buffer,
+so an export of any size holds one chunk of rows in memory and the download
+starts with the first chunk. Views wrap the generator with
+``home.streaming.streaming_content`` so this also holds under ASGI.
+"""
+import csv
+
+from .models import EventApplication
+
+# Rows fetched per round trip while streaming
+CHUNK_SIZE = 2000
+
+APPLICATION_COLUMNS = [
+    ('event_id', 'Event ID'),
+    ('event__title', 'Event'),
+    ('event__date', 'Date'),
+    ('event__start_time', 'Start time'),
+    ('event__end_time', 'End time'),
+    ('event__status', 'Event status'),
+    ('talent_type__talent_type', 'Talent type'),
+    ('performer__username', 'Performer'),
+    ('status', 'Application status'),
+    ('created_at', 'Applied at'),
+]
+
+
+class Echo:
+    """File-like object whose write() just returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def _cell(value):
+    # Stop spreadsheet apps from evaluating user-entered text as a formula
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@'):
+        return "'" + value
+    return value
+
+
+def application_rows(organizer, event_id=None):
+    applications = EventApplication.objects.filter(event__organizer=organizer)
+    if event_id is not None:
+        applications = applications.filter(event_id=event_id)
+    return (
+        applications
+        .order_by('event__date', 'event__start_time', 'event_id', 'created_at', 'id')
+        .values_list(*(field for field, _ in APPLICATION_COLUMNS))
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def stream_csv(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow([_cell(value) for value in row])
+
+
+def stream_applications(organizer, event_id=None):
+    return stream_csv([label for _, label in APPLICATION_COLUMNS], application_rows(organizer, event_id))
@@ -0,0 +1,94 @@
+"""Calendar feed data shared by the FullCalendar JSON endpoints."""
+from datetime import timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .availability import availability_blocks
+from .models import TimelineEntry
+
+# Window served when a client doesn't send FullCalendar's start/end
+DEFAULT_WINDOW_DAYS = 42
+# Widest window a single request may ask for
+MAX_WINDOW_DAYS = 366
+
+# Timeline kinds shown on the event calendar, and the role each represents
+EVENT_ROLES = {'organizing': 'organizer', 'performing': 'performer'}
+EVENT_ROLE_STYLES = {
+    'organizer': {'label': 'Organizing', 'backgroundColor': '#2563eb', 'borderColor': '#1d4ed8'},  # blue
+    'performer': {'label': 'Performing', 'backgroundColor': '#22c55e', 'borderColor': '#16a34a'},  # green
+}
+
+
+def _parse_day(value):
+    # FullCalendar sends ISO 8601 timestamps in the viewer's local time; the
+    # leading date is what matters since events are stored as local dates.
+    if not value:
+        return None
+    try:
+        return parse_date(value[:10])
+    except ValueError:
+        return None
+
+
+def parse_window(request):
+    """Return the half-open ``[start, end)`` date range requested by the client."""
+    start = _parse_day(request.GET.get('start'))
+    end = _parse_day(request.GET.get('end'))
+    if start is None and end is None:
+        start = timezone.now().date()
+    if start is None:
+        start = end - timedelta(days=DEFAULT_WINDOW_DAYS)
+    if end is None:
+        end = start + timedelta(days=DEFAULT_WINDOW_DAYS)
+    end = min(max(end, start), start + timedelta(days=MAX_WINDOW_DAYS))
+    return start, end
+
+
+def event_feed(user, start, end):
+    """Published events ``user`` organises or performs in, between start and end.
+
+    Read from the user's timeline in one index range scan; an event the user
+    both organises and performs in yields one entry for each role.
+    """
+    rows = (
+        TimelineEntry.objects
+        .filter(user=user, kind__in=EVENT_ROLES, date__gte=start, date__lt=end)
+        .order_by('date', 'start_time', 'id')
+        .values('event_id', 'kind', 'title', 'date', 'start_time', 'end_time')
+    )
+    return [_event_entry(row, EVENT_ROLES[row['kind']]) for row in rows]
+
+
+def availability_feed(user, start, end):
+    """Background availability blocks for ``user`` between start and end.
+
+    Weekly rules are expanded only across the requested window, combined with
+    one-off slots, and overlapping slots are merged before serialisation.
+    """
+    data = []
+    for block in availability_blocks(user, start, end):
+        data.append({
+            'id': f"avail-{block['key']}",
+            'title': block['note'] or 'Available',
+            'start': f"{block['date']}T{block['start_time']}",
+            'end': f"{block['date']}T{block['end_time']}",
+            'backgroundColor': '#38bdf8',  # light blue
+            'borderColor': '#0ea5e9',
+            'display': 'background'
+        })
+    return data
+
+
+def _event_entry(row, role):
+    style = EVENT_ROLE_STYLES[role]
+    return {
+        'id': f"{role}-{row['event_id']}",
+        'title': f"[{style['label']}] {row['title']}",
+        'start': f"{row['date']}T{row['start_time']}",
+        'end': f"{row['date']}T{row['end_time']}",
+        'url': f"/events/{row['event_id']}/",
+        'backgroundColor': style['backgroundColor'],
+        'borderColor': style['borderColor'],
+        'display': 'block',
+    }
@@ -0,0 +1,105 @@
+"""iCalendar subscription feed of a user's events.
+
+Feeds are read from the user's timeline, the same rows behind the events
+JSON endpoint, and streamed one VEVENT at a time. Their URLs carry a token
+derived from the user's password hash, so changing the password revokes
+every existing subscription.
+
+``render_feed`` is a plain generator; the view passes it through
+``home.streaming.streaming_content`` so it also streams under ASGI.
+"""
+from datetime import timezone
+
+from django.db.models import Count, Max
+from django.utils.crypto import salted_hmac
+
+from .feeds import EVENT_ROLES, EVENT_ROLE_STYLES
+from .models import TimelineEntry
+
+PRODID = '-//Campus Booking//Event Calendar//EN'
+# Entries fetched per round trip while streaming
+CHUNK_SIZE = 500
+
+
+def feed_token(user):
+    return salted_hmac('home.ics.feed', f'{user.pk}:{user.password}').hexdigest()[:32]
+
+
+def feed_entries(user):
+    return TimelineEntry.objects.filter(user=user, kind__in=EVENT_ROLES)
+
+
+def feed_version(user):
+    """Return ``(etag, last_modified)`` for the user's feed.
+
+    Built from the timeline alone, so an unchanged poll never reads the event
+    tables. The entry count catches deletions that leave the newest
+    ``updated_at`` alone.
+    """
+    stats = feed_entries(user).aggregate(count=Count('id'), last_modified=Max('updated_at'))
+    last_modified = stats['last_modified']
+    stamp = int(last_modified.timestamp()) if last_modified else 0
+    return f'"{stats["count"]}-{stamp}"', last_modified
+
+
+def _escape(text):
+    return (
+        text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    # RFC 5545 lines are limited to 75 octets; continuations start with a space
+    encoded = line.encode()
+    chunks = []
+    while len(encoded) > 75:
+        cut = 75 if not chunks else 74
+        # Don't split a multi-byte character
+        while cut and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        chunks.append(encoded[:cut])
+        encoded = encoded[cut:]
+    chunks.append(encoded)
+    return '\r\n '.join(chunk.decode() for chunk in chunks) + '\r\n'
+
+
+def _stamp(day, time):
+    return f'{day:%Y%m%d}T{time:%H%M%S}'
+
+
+def render_feed(user, event_url):
+    """Yield the feed as iCalendar text, one component at a time.
+
+    ``event_url`` maps an event id to an absolute URL.
+    """
+    yield _fold('BEGIN:VCALENDAR')
+    yield _fold('VERSION:2.0')
+    yield _fold(f'PRODID:{PRODID}')
+    yield _fold('CALSCALE:GREGORIAN')
+    yield _fold('METHOD:PUBLISH')
+    yield _fold(f'X-WR-CALNAME:{_escape(user.username)}')
+
+    rows = (
+        feed_entries(user)
+        .order_by('date', 'start_time', 'id')
+        .values_list('event_id', 'kind', 'title', 'location', 'date', 'start_time', 'end_time', 'updated_at')
+    )
+    for event_id, kind, title, location, day, start, end, updated_at in rows.iterator(chunk_size=CHUNK_SIZE):
+        label = EVENT_ROLE_STYLES[EVENT_ROLES[kind]]['label']
+        lines = [
+            'BEGIN:VEVENT',
+            f'UID:{kind}-{event_id}@campusbooking',
+            f'DTSTAMP:{updated_at.astimezone(timezone.utc):%Y%m%dT%H%M%SZ}',
+            # Floating times: events are stored in local time without a zone
+            f'DTSTART:{_stamp(day, start)}',
+            f'DTEND:{_stamp(day, end)}',
+            f'SUMMARY:{_escape(f"[{label}] {title}")}',
+            f'URL:{event_url(event_id)}',
+        ]
+        if location:
+            lines.append(f'LOCATION:{_escape(location)}')
+        lines.append('END:VEVENT')
+        yield ''.join(_fold(line) for line in lines)
+
+    yield _fold('END:VCALENDAR')
@@ -0,0 +1,53 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from home.catalog import DEFAULT_BATCH_SIZE, KINDS, CatalogImporter, read_rows
+
+class Command(BaseCommand):
+    help = (
+        'Bulk imports categories, venues, events or talent needs from CSV or JSON Lines. '
+        'Columns: categories name,description; venues name,address,city,state,zip_code; '
+        'events organizer,title,date,start_time,end_time,description,category,venue,venue_city,status; '
+        'talent organizer,title,date,start_time,talent_type,quantity_needed,description'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=KINDS, help='What the file contains')
+        parser.add_argument('path', help="Input file, or '-' for standard input")
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Input format (default: from the file extension, else csv)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Rows written per transaction')
+        parser.add_argument('--update', action='store_true',
+                            help='Update rows that already exist (matched by natural key) instead of skipping them')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        importer = CatalogImporter(options['kind'], update=options['update'], batch_size=options['batch_size'])
+        started = time.monotonic()
+        if path == '-':
+            stats = importer.run(read_rows(sys.stdin, fmt))
+        else:
+            try:
+                with open(path, newline='', encoding='utf-8') as stream:
+                    stats = importer.run(read_rows(stream, fmt))
+            except OSError as e:
+                raise CommandError(f'Cannot read {path}: {e}')
+        elapsed = time.monotonic() - started
+
+        for line, error in stats.errors[:20]:
+            self.stdout.write(self.style.WARNING(f'Row {line}: {error}'))
+        if len(stats.errors) > 20:
+            self.stdout.write(self.style.WARNING(f'... and {len(stats.errors) - 20} more row errors'))
+
+        rate = stats.rows / elapsed if elapsed else stats.rows
+        self.stdout.write(self.style.SUCCESS(
+            f'Read {stats.rows} {options["kind"]} rows in {elapsed:.2f}s ({rate:.0f} rows/s): '
+            f'{stats.created} created, {stats.updated} updated, {stats.unchanged} unchanged, '
+            f'{len(stats.errors)} skipped'
+        ))
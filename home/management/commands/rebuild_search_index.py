@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from home import search
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text event search index from the event table'
+
+    def handle(self, *args, **options):
+        count = search.rebuild_index()
+        if count is None:
+            self.stdout.write(self.style.WARNING(
+                'Full-text index not available on this database; search uses the fallback backend.'
+            ))
+            return
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} events'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from home import timeline
+
+class Command(BaseCommand):
+    help = 'Rebuilds the per-user calendar timeline from events, applications, calendar entries and availability'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--username',
+            type=str,
+            help='Only rebuild this user (optional)',
+        )
+
+    def handle(self, *args, **options):
+        username = options.get('username')
+        user_ids = None
+        if username:
+            user_ids = list(User.objects.filter(username=username).values_list('id', flat=True))
+            if not user_ids:
+                self.stdout.write(self.style.ERROR(f'User {username} does not exist'))
+                return
+
+        count = timeline.rebuild(user_ids)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {count} timeline entries'))
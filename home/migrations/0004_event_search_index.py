@@ -0,0 +1,42 @@
+from django.db import OperationalError, migrations
+
+# Frozen copies of home.search's DDL, so later changes there don't alter history
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                'CREATE VIRTUAL TABLE IF NOT EXISTS home_event_fts '
+                "USING fts5(title, description, category, venue, tokenize='porter unicode61')"
+            )
+        except OperationalError:
+            # SQLite built without FTS5: search falls back to icontains
+            return
+        cursor.execute('DELETE FROM home_event_fts')
+        cursor.execute(
+            'INSERT INTO home_event_fts(rowid, title, description, category, venue) '
+            "SELECT e.id, e.title, e.description, COALESCE(c.name, ''), COALESCE(v.name, '') "
+            'FROM home_event e '
+            'LEFT JOIN home_category c ON c.id = e.category_id '
+            'LEFT JOIN home_venue v ON v.id = e.venue_id'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS home_event_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0003_event_status_date_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
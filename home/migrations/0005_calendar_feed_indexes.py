@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0004_event_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['organizer', 'date'], name='home_event_organizer_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventapplication',
+            index=models.Index(fields=['performer', 'status'], name='home_app_performer_status_idx'),
+        ),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+BATCH_SIZE = 1000
+
+
+def backfill_timeline(apps, schema_editor):
+    # Mirrors home.timeline.rebuild() with historical models, so later
+    # changes to the live models can't break this migration.
+    Event = apps.get_model('home', 'Event')
+    EventApplication = apps.get_model('home', 'EventApplication')
+    Availability = apps.get_model('home', 'Availability')
+    TimelineEntry = apps.get_model('home', 'TimelineEntry')
+    CalendarEvent = apps.get_model('accounts', 'CalendarEvent')
+
+    def event_entry(row, user_id, kind):
+        return TimelineEntry(
+            user_id=user_id, date=row['date'], start_time=row['start_time'], end_time=row['end_time'],
+            kind=kind, title=row['title'], location=row['venue__name'] or '', event_id=row['id'],
+        )
+
+    events = list(
+        Event.objects.filter(status='published').order_by('id')
+        .values('id', 'title', 'date', 'start_time', 'end_time', 'organizer_id', 'venue__name')
+    )
+    for start in range(0, len(events), BATCH_SIZE):
+        batch = {row['id']: row for row in events[start:start + BATCH_SIZE]}
+        entries = [event_entry(row, row['organizer_id'], 'organizing') for row in batch.values()]
+        performers = (
+            EventApplication.objects.filter(event_id__in=batch, status='accepted')
+            .values_list('event_id', 'performer_id').distinct()
+        )
+        entries += [event_entry(batch[event_id], performer_id, 'performing') for event_id, performer_id in performers]
+        TimelineEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=entry.user_id, date=entry.date, start_time=entry.start_time, end_time=entry.end_time,
+                kind='calendar', title=entry.title, location=entry.location,
+                event_id=entry.related_event_id, source_id=entry.id,
+            )
+            for entry in CalendarEvent.objects.iterator()
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=slot.user_id, date=slot.date, start_time=slot.start_time, end_time=slot.end_time,
+                kind='availability', title=slot.note, source_id=slot.id,
+            )
+            for slot in Availability.objects.iterator()
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_calendar_event_booking_index'),
+        ('home', '0006_availability_rules'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('kind', models.CharField(choices=[('organizing', 'Organizing'), ('performing', 'Performing'), ('calendar', 'Calendar entry'), ('availability', 'Availability')], max_length=20)),
+                ('title', models.CharField(blank=True, max_length=255)),
+                ('location', models.CharField(blank=True, max_length=255)),
+                ('event_id', models.BigIntegerField(blank=True, null=True)),
+                ('source_id', models.BigIntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['date', 'start_time'],
+                'indexes': [models.Index(fields=['user', 'date', 'start_time'], name='home_timeline_user_date_idx'), models.Index(fields=['event_id'], name='home_timeline_event_idx'), models.Index(fields=['kind', 'source_id'], name='home_timeline_source_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_timeline, migrations.RunPython.noop),
+    ]
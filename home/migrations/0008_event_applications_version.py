@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0007_timeline_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='applications_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -41,9 +41,20 @@ class Event(models.Model):
     organizer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='organized_events')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
     allow_manual_invites = models.BooleanField(default=True)
+    # Bumped whenever the event's talent needs or applications change; part of
+    # the cache key of the fragments that render them
+    applications_version = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Serves the catalogue's keyset pagination on (date, start_time, id)
+            models.Index(fields=['status', 'date', 'start_time'], name='home_event_status_date_idx'),
+            # Serves the per-user calendar feed
+            models.Index(fields=['organizer', 'date'], name='home_event_organizer_date_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -55,6 +66,11 @@ class Event(models.Model):
     def is_upcoming(self):
         return self.date >= timezone.now().date()
 
+    @staticmethod
+    def bump_applications_version(event_id):
+        # A queryset update: doesn't touch updated_at or send save signals
+        Event.objects.filter(pk=event_id).update(applications_version=models.F('applications_version') + 1)
+
 class EventTalent(models.Model):
     TALENT_TYPE_CHOICES = [
         ('musician', 'Musician'),
@@ -92,6 +108,9 @@ class EventApplication(models.Model):
 
     class Meta:
         unique_together = ['event', 'performer', 'talent_type']
+        indexes = [
+            models.Index(fields=['performer', 'status'], name='home_app_performer_status_idx'),
+        ]
 
 class Availability(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='availabilities')
@@ -108,3 +127,98 @@ class Availability(models.Model):
 
     def __str__(self):
         return f"{self.user.username} available {self.date} {self.start_time}-{self.end_time}";
+
+class AvailabilityRule(models.Model):
+    WEEKDAY_CHOICES = [
+        (0, 'Monday'),
+        (1, 'Tuesday'),
+        (2, 'Wednesday'),
+        (3, 'Thursday'),
+        (4, 'Friday'),
+        (5, 'Saturday'),
+        (6, 'Sunday'),
+    ]
+
+    # One row per weekly slot; occurrences are expanded on read by home.availability
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='availability_rules')
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    valid_from = models.DateField()
+    valid_until = models.DateField(null=True, blank=True)
+    note = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['weekday', 'start_time']
+        indexes = [
+            models.Index(fields=['user', 'weekday', 'start_time'], name='home_availrule_user_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} available {self.get_weekday_display()}s {self.start_time}-{self.end_time}"
+
+class AvailabilityException(models.Model):
+    # Cancels recurring occurrences on a date: all of them when no times are
+    # given, otherwise those overlapping the given time range.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='availability_exceptions')
+    date = models.DateField()
+    start_time = models.TimeField(null=True, blank=True)
+    end_time = models.TimeField(null=True, blank=True)
+    note = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['date', 'start_time']
+        indexes = [
+            models.Index(fields=['user', 'date'], name='home_availexc_user_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} unavailable {self.date}"
+
+class TimelineEntry(models.Model):
+    KIND_CHOICES = [
+        ('organizing', 'Organizing'),
+        ('performing', 'Performing'),
+        ('calendar', 'Calendar entry'),
+        ('availability', 'Availability'),
+    ]
+
+    # Denormalised read model of everything on a user's calendar, maintained
+    # by home.timeline from events, accepted applications, calendar entries
+    # and one-off availability slots.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline_entries')
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    title = models.CharField(max_length=255, blank=True)
+    location = models.CharField(max_length=255, blank=True)
+    # Event shown by organizing/performing rows, or linked to a calendar entry
+    event_id = models.BigIntegerField(null=True, blank=True)
+    # CalendarEvent or Availability id for calendar/availability rows
+    source_id = models.BigIntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['date', 'start_time']
+        indexes = [
+            models.Index(fields=['user', 'date', 'start_time'], name='home_timeline_user_date_idx'),
+            models.Index(fields=['event_id'], name='home_timeline_event_idx'),
+            models.Index(fields=['kind', 'source_id'], name='home_timeline_source_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.kind} {self.date} {self.start_time}-{self.end_time}"
+
+
+class VersionStamp(models.Model):
+    # Shared counters that let every worker notice a change to data it caches
+    # in process, e.g. home.reference's categories and venues.
+    key = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key} v{self.version}"
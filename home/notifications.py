@@ -0,0 +1,55 @@
+"""Notifications sent when events and applications change."""
+from accounts.notifications import fan_out
+
+from .models import EventApplication
+
+EVENT_CHANGE_MESSAGES = {
+    'updated': ('Event updated', 'The details of "{title}" have changed.'),
+    'cancelled': ('Event cancelled', '"{title}" has been cancelled.'),
+    'republished': ('Event republished', '"{title}" is back on.'),
+    'unpublished': ('Event unpublished', '"{title}" has been moved back to draft.'),
+}
+
+
+def event_change(previous_status, new_status):
+    """Classify a status transition, or return None if nobody needs telling."""
+    if new_status == 'cancelled':
+        return 'cancelled' if previous_status != 'cancelled' else None
+    if new_status == 'published':
+        return 'republished' if previous_status == 'cancelled' else 'updated'
+    if previous_status == 'published':
+        return 'unpublished'
+    return None
+
+
+def applicant_ids(event):
+    return list(
+        EventApplication.objects.filter(event=event).values_list('performer_id', flat=True).distinct()
+    )
+
+
+def notify_event_change(event, change, recipient_ids=None):
+    if recipient_ids is None:
+        recipient_ids = applicant_ids(event)
+    title, message = EVENT_CHANGE_MESSAGES[change]
+    return fan_out(recipient_ids, 'event', title, message.format(title=event.title), link=f'/events/{event.id}/')
+
+
+def notify_application_status(application):
+    return fan_out(
+        [application.performer_id],
+        'application',
+        f'Application {application.status}',
+        f'Your application to "{application.event.title}" was {application.status}.',
+        link=f'/events/{application.event_id}/',
+    )
+
+
+def notify_new_application(application):
+    return fan_out(
+        [application.event.organizer_id],
+        'application',
+        'New application',
+        f'{application.performer.username} applied to perform at "{application.event.title}".',
+        link=f'/events/{application.event_id}/',
+    )
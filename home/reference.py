@@ -0,0 +1,48 @@
+"""Per-process cache of categories and venues for dropdowns and cards.
+
+Each worker keeps its own copy, tagged with the shared ``reference``
+VersionStamp. Saving or deleting a Category or Venue bumps the stamp (see
+``home.signals``), and a worker reloads its copy the next time it reads a
+newer stamp, so changes show up on the next request in every worker.
+"""
+import threading
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Category, Venue, VersionStamp
+
+VERSION_KEY = 'reference'
+
+_lock = threading.Lock()
+# (version, categories, venues), swapped as a whole so readers never mix versions
+_cache = [(None, [], [])]
+
+
+def current_version():
+    return VersionStamp.objects.filter(key=VERSION_KEY).values_list('version', flat=True).first() or 0
+
+
+def bump_version():
+    if VersionStamp.objects.filter(key=VERSION_KEY).update(version=F('version') + 1):
+        return
+    try:
+        with transaction.atomic():
+            VersionStamp.objects.create(key=VERSION_KEY, version=1)
+    except IntegrityError:
+        # Another worker created the row first
+        VersionStamp.objects.filter(key=VERSION_KEY).update(version=F('version') + 1)
+
+
+def reference_data():
+    """Return ``(version, categories, venues)``, reloading only if the stamp moved.
+
+    The lists are shared between requests and must not be modified.
+    """
+    version = current_version()
+    snapshot = _cache[0]
+    if snapshot[0] != version:
+        snapshot = (version, list(Category.objects.all()), list(Venue.objects.all()))
+        with _lock:
+            _cache[0] = snapshot
+    return snapshot
@@ -0,0 +1,183 @@
+"""Full-text search over events.
+
+On SQLite the index is an FTS5 table keyed by event id and kept in sync by the
+handlers in ``home.signals``. PostgreSQL ranks with its built-in text search,
+and any other backend falls back to ``icontains``.
+"""
+import re
+
+from django.db import OperationalError, connections, router
+from django.db.models import Q
+
+from .models import Category, Event, Venue
+
+FTS_TABLE = 'home_event_fts'
+# Column weights for bm25(): title, description, category, venue
+FTS_WEIGHTS = (10.0, 4.0, 2.0, 2.0)
+# Keeps IN (...) lists under SQLite's bound-parameter limit
+BATCH_SIZE = 500
+
+_TOKEN_RE = re.compile(r'\w+')
+_fts_tables = {}
+
+
+def _document_sql():
+    return (
+        f'SELECT e.id, e.title, e.description, COALESCE(c.name, \'\'), COALESCE(v.name, \'\') '
+        f'FROM {Event._meta.db_table} e '
+        f'LEFT JOIN {Category._meta.db_table} c ON c.id = e.category_id '
+        f'LEFT JOIN {Venue._meta.db_table} v ON v.id = e.venue_id'
+    )
+
+
+def create_index(connection):
+    """Create and backfill the FTS5 table. Returns False if FTS5 is unavailable."""
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+                f"USING fts5(title, description, category, venue, tokenize='porter unicode61')"
+            )
+        except OperationalError:
+            return False
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(f'INSERT INTO {FTS_TABLE}(rowid, title, description, category, venue) {_document_sql()}')
+    _fts_tables.pop(connection.alias, None)
+    return True
+
+
+def drop_index(connection):
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    _fts_tables.pop(connection.alias, None)
+
+
+def fts_enabled(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    if connection.alias not in _fts_tables:
+        _fts_tables[connection.alias] = FTS_TABLE in connection.introspection.table_names()
+    return _fts_tables[connection.alias]
+
+
+def _write_connection():
+    return connections[router.db_for_write(Event)]
+
+
+def _batches(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), BATCH_SIZE):
+        yield ids[start:start + BATCH_SIZE]
+
+
+def index_events(event_ids):
+    """(Re)index the given events from their current rows."""
+    connection = _write_connection()
+    if not fts_enabled(connection):
+        return
+    with connection.cursor() as cursor:
+        for batch in _batches(event_ids):
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', batch)
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE}(rowid, title, description, category, venue) '
+                f'{_document_sql()} WHERE e.id IN ({placeholders})',
+                batch,
+            )
+
+
+def remove_events(event_ids):
+    connection = _write_connection()
+    if not fts_enabled(connection):
+        return
+    with connection.cursor() as cursor:
+        for batch in _batches(event_ids):
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', batch)
+
+
+def update_related_name(field, pk, name):
+    """Rewrite the denormalised category/venue name on every indexed event."""
+    connection = _write_connection()
+    if not fts_enabled(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {FTS_TABLE} SET {field} = %s '
+            f'WHERE rowid IN (SELECT id FROM {Event._meta.db_table} WHERE {field}_id = %s)',
+            [name, pk],
+        )
+
+
+def rebuild_index():
+    """Rebuild the index from scratch. Returns the number of indexed events, or None."""
+    connection = _write_connection()
+    if not create_index(connection):
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def ranked_event_ids(text, queryset, offset=0, limit=20):
+    """Return ids of events in ``queryset`` matching ``text``, best match first.
+
+    The queryset's filters are applied inside the ranked query, so ``offset``
+    and ``limit`` page through the filtered matches only.
+    """
+    tokens = _TOKEN_RE.findall(text.lower())
+    if not tokens:
+        return []
+
+    connection = connections[queryset.db]
+    if fts_enabled(connection):
+        # Each token is quoted so user input can't inject FTS5 syntax, and
+        # prefix-matched so partially typed words still hit.
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        rank = f'bm25({FTS_TABLE}, {", ".join(str(w) for w in FTS_WEIGHTS)})'
+        candidates, params = queryset.order_by().values('id').query.get_compiler(queryset.db).as_sql()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid IN ({candidates}) '
+                f'ORDER BY {rank}, rowid LIMIT %s OFFSET %s',
+                [match, *params, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        vector = (
+            SearchVector('title', weight='A')
+            + SearchVector('description', weight='B')
+            + SearchVector('category__name', 'venue__name', weight='C')
+        )
+        query = SearchQuery(' & '.join(f'{token}:*' for token in tokens), search_type='raw')
+        return list(
+            queryset.annotate(search=vector, rank=SearchRank(vector, query))
+            .filter(search=query)
+            .order_by('-rank', 'id')
+            .values_list('id', flat=True)[offset:offset + limit]
+        )
+
+    match = Q()
+    for token in tokens:
+        match &= Q(title__icontains=token) | Q(description__icontains=token)
+    return list(
+        queryset.filter(match).order_by('date', 'start_time', 'id')
+        .values_list('id', flat=True)[offset:offset + limit]
+    )
+
+
+def search_page(queryset, text, offset=0, page_size=20):
+    """Return ``(events, next_offset)`` for one page of relevance-ranked results."""
+    # One extra id tells whether another page follows
+    ranked_ids = ranked_event_ids(text, queryset, offset, page_size + 1)
+    page_ids = ranked_ids[:page_size]
+    position = {event_id: i for i, event_id in enumerate(page_ids)}
+    events = sorted(queryset.filter(id__in=page_ids), key=lambda event: position[event.id])
+    next_offset = offset + page_size if len(ranked_ids) > page_size else None
+    return events, next_offset
@@ -0,0 +1,86 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import reference, search, timeline
+from .models import Availability, Category, Event, EventApplication, EventTalent, Venue
+
+
+# Keep the full-text search index in sync with events and the category/venue
+# names denormalised into it.
+@receiver(post_save, sender=Event)
+def index_event(sender, instance, **kwargs):
+    search.index_events([instance.pk])
+
+@receiver(post_delete, sender=Event)
+def unindex_event(sender, instance, **kwargs):
+    search.remove_events([instance.pk])
+
+@receiver(post_save, sender=Category)
+def reindex_category(sender, instance, **kwargs):
+    search.update_related_name('category', instance.pk, instance.name)
+
+@receiver(pre_delete, sender=Category)
+def clear_category(sender, instance, **kwargs):
+    search.update_related_name('category', instance.pk, '')
+
+@receiver(post_save, sender=Venue)
+def reindex_venue(sender, instance, **kwargs):
+    search.update_related_name('venue', instance.pk, instance.name)
+
+@receiver(pre_delete, sender=Venue)
+def clear_venue(sender, instance, **kwargs):
+    search.update_related_name('venue', instance.pk, '')
+
+
+# Keep the per-user timeline in step with the rows it mirrors. Bulk writes
+# send no signals and sync the timeline themselves.
+@receiver(post_save, sender=Event)
+def sync_event_timeline(sender, instance, **kwargs):
+    timeline.sync_event(instance.pk)
+
+@receiver(post_delete, sender=Event)
+def remove_event_timeline(sender, instance, **kwargs):
+    timeline.remove_event(instance.pk)
+
+@receiver(post_save, sender=Venue)
+def rename_venue_timeline(sender, instance, **kwargs):
+    timeline.rename_venue(instance.pk, instance.name)
+
+@receiver(post_save, sender=EventApplication)
+@receiver(post_delete, sender=EventApplication)
+def sync_application_timeline(sender, instance, **kwargs):
+    timeline.sync_event(instance.event_id)
+
+@receiver(post_save, sender='accounts.CalendarEvent')
+def sync_calendar_timeline(sender, instance, **kwargs):
+    timeline.sync_calendar_entry(instance)
+
+@receiver(post_delete, sender='accounts.CalendarEvent')
+def remove_calendar_timeline(sender, instance, **kwargs):
+    timeline.remove_source('calendar', instance.pk)
+
+@receiver(post_save, sender=Availability)
+def sync_availability_timeline(sender, instance, **kwargs):
+    timeline.sync_availability_slot(instance)
+
+@receiver(post_delete, sender=Availability)
+def remove_availability_timeline(sender, instance, **kwargs):
+    timeline.remove_source('availability', instance.pk)
+
+
+# Invalidate the cached talent and applicant fragments of an event.
+@receiver(post_save, sender=EventTalent)
+@receiver(post_delete, sender=EventTalent)
+@receiver(post_save, sender=EventApplication)
+@receiver(post_delete, sender=EventApplication)
+def bump_applications_version(sender, instance, **kwargs):
+    Event.bump_applications_version(instance.event_id)
+
+
+# Tell every worker to reload its cached categories and venues.
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Venue)
+@receiver(post_delete, sender=Venue)
+def bump_reference_version(sender, **kwargs):
+    reference.bump_version()
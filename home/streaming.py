@@ -0,0 +1,26 @@
+"""Response bodies that stream under both WSGI and ASGI.
+
+Under ASGI, Django reads a synchronous ``StreamingHttpResponse`` iterator
+fully into memory before sending anything. ``streaming_content`` hands ASGI
+an async iterator instead, pulling one chunk of the synchronous iterator per
+thread hop, and leaves WSGI with the plain iterator.
+"""
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+
+async def iterate_chunks(iterable, chunk_size):
+    """Yield ``iterable``'s strings joined ``chunk_size`` at a time, without blocking the loop."""
+    iterator = iter(iterable)
+    # Database cursors behind the iterator stay on the one sync thread
+    next_chunk = sync_to_async(lambda: list(islice(iterator, chunk_size)))
+    while chunk := await next_chunk():
+        yield ''.join(chunk)
+
+
+def streaming_content(request, iterable, chunk_size):
+    if isinstance(request, ASGIRequest):
+        return iterate_chunks(iterable, chunk_size)
+    return iterable
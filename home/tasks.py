@@ -0,0 +1,25 @@
+"""Background tasks run by ``manage.py run_worker``.
+
+Tasks take ids rather than model instances so their payloads stay JSON, and
+tolerate rows that were deleted before the job ran.
+"""
+from .models import Event, EventApplication
+from .notifications import notify_application_status, notify_event_change, notify_new_application
+
+
+def send_event_change(event_id, change, recipient_ids):
+    event = Event.objects.filter(id=event_id).first()
+    if event:
+        notify_event_change(event, change, recipient_ids)
+
+
+def send_application_status(application_id):
+    application = EventApplication.objects.select_related('event').filter(id=application_id).first()
+    if application:
+        notify_application_status(application)
+
+
+def send_new_application(application_id):
+    application = EventApplication.objects.select_related('event', 'performer').filter(id=application_id).first()
+    if application:
+        notify_new_application(application)
@@ -1 +0,0 @@
-# This file is intentionally empty to make the directory a Python package 
\ No newline at end of file
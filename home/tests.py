@@ -1,3 +1,565 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from datetime import date, time, timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import CalendarEvent, Notification, Profile
+from campusbooking.db_router import PIN_COOKIE, PrimaryReplicaRouter, ReadYourWritesMiddleware, replica_reads
+
+from . import ics, reference, timeline
+from .availability import expand_rules, merge_intervals
+from .catalog import CatalogImporter, read_rows
+from .bookings import IntervalIndex, booking_index
+from .models import Availability, AvailabilityRule, Category, Event, EventApplication, EventTalent, TimelineEntry, Venue
+from .pagination import decode_cursor, encode_cursor, paginate
+from .search import ranked_event_ids
+
+
+def make_event(organizer, title='Event', day=None, start=time(10), end=time(12), status='published', **fields):
+    fields.setdefault('description', '')
+    return Event.objects.create(
+        title=title,
+        date=day or date.today() + timedelta(days=1),
+        start_time=start,
+        end_time=end,
+        organizer=organizer,
+        status=status,
+        **fields
+    )
+
+
+class PaginationTests(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('organizer', password='pw')
+
+    def test_cursor_round_trip(self):
+        values = [date(2030, 1, 2), time(9, 30), 7]
+        cursor = encode_cursor(values)
+        parsers = (date.fromisoformat, time.fromisoformat, int)
+        self.assertEqual(decode_cursor(cursor, parsers), values)
+
+    def test_malformed_cursor_is_ignored(self):
+        self.assertIsNone(decode_cursor('not a cursor', (int,)))
+        self.assertIsNone(decode_cursor(encode_cursor([1, 2]), (int,)))
+        self.assertIsNone(decode_cursor(None, (int,)))
+
+    def test_pages_cover_every_row_once_despite_ties(self):
+        # Shared dates and start times force the id tie-breaker to matter
+        day = date(2030, 1, 1)
+        for i in range(25):
+            make_event(self.organizer, f'E{i}', day=day + timedelta(days=i % 3), start=time(10 + i % 2))
+        fields = ['date', 'start_time', 'id']
+        seen, cursor = [], None
+        while True:
+            rows, cursor = paginate(Event.objects.all(), fields, cursor, page_size=4)
+            seen += rows
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len({event.id for event in seen}), 25)
+        self.assertEqual(seen, sorted(seen, key=lambda event: (event.date, event.start_time, event.id)))
+
+    def test_descending_pages(self):
+        for i in range(5):
+            make_event(self.organizer, f'E{i}')
+        rows, cursor = paginate(Event.objects.all(), ['id'], page_size=3, descending=True)
+        more, end = paginate(Event.objects.all(), ['id'], cursor, page_size=3, descending=True)
+        ids = [event.id for event in rows + more]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertIsNone(end)
+
+    def test_event_list_walks_every_upcoming_event(self):
+        for i in range(30):
+            make_event(self.organizer, f'E{i}', start=time(8 + i % 4))
+        make_event(self.organizer, 'Past', day=date.today() - timedelta(days=1))
+        make_event(self.organizer, 'Draft', status='draft')
+        titles, url = [], reverse('event_list')
+        while url:
+            response = self.client.get(url)
+            titles += [event.title for event in response.context['events']]
+            query = response.context.get('next_page_query')
+            url = f"{reverse('event_list')}?{query}" if query else None
+        self.assertEqual(sorted(titles), sorted(f'E{i}' for i in range(30)))
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('organizer', password='pw')
+
+    def search(self, text):
+        return ranked_event_ids(text, Event.objects.all())
+
+    def test_title_matches_rank_above_description_matches(self):
+        in_description = make_event(self.organizer, 'Dance', description='Some jazz tunes')
+        in_title = make_event(self.organizer, 'Jazz Night', description='Smooth')
+        # Partial words still match
+        self.assertEqual(self.search('jaz'), [in_title.id, in_description.id])
+        # FTS5 syntax in the input is treated as text
+        self.assertEqual(self.search('jazz" NEAR('), [])
+        self.assertEqual(self.search('"jazz'), [in_title.id, in_description.id])
+
+    def test_renaming_venue_or_category_reindexes_its_events(self):
+        venue = Venue.objects.create(name='Blue Hall', address='a', city='c', state='s', zip_code='1')
+        category = Category.objects.create(name='Music')
+        event = make_event(self.organizer, 'Gig', venue=venue, category=category)
+        self.assertEqual(self.search('blue music'), [event.id])
+        venue.name = 'Red Room'
+        venue.save()
+        self.assertEqual(self.search('blue'), [])
+        self.assertEqual(self.search('red'), [event.id])
+        category.delete()
+        self.assertEqual(self.search('music'), [])
+
+    def test_deleted_events_leave_the_index(self):
+        event = make_event(self.organizer, 'Jazz Night')
+        kept = make_event(self.organizer, 'Jazz Brunch')
+        event.delete()
+        self.assertEqual(self.search('jazz'), [kept.id])
+
+    def test_event_list_filters_before_ranking(self):
+        # Matching past events must not crowd upcoming ones out of the page
+        past = date.today() - timedelta(days=30)
+        for i in range(30):
+            make_event(self.organizer, f'Jazz night {i}', day=past)
+        upcoming = make_event(self.organizer, 'Jazz brunch')
+        make_event(self.organizer, 'Jazz draft', status='draft')
+
+        response = self.client.get(reverse('event_list'), {'search': 'jazz'})
+        self.assertEqual([event.id for event in response.context['events']], [upcoming.id])
+        self.assertIsNone(response.context.get('next_page_query'))
+        response = self.client.get(reverse('event_list'), {'search': 'jazz', 'past': '1'})
+        self.assertEqual(len(response.context['events']), 24)
+        self.assertIsNotNone(response.context.get('next_page_query'))
+
+
+class EventDetailTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.organizer = User.objects.create_user('organizer', password='pw')
+        Profile.objects.filter(user=self.organizer).update(role='organizer')
+
+    def event_with_applicants(self, title, needs, applicants_per_need):
+        event = make_event(self.organizer, title)
+        for n in range(needs):
+            talent = EventTalent.objects.create(event=event, talent_type='dancer', description=f'Role {n}')
+            for a in range(applicants_per_need):
+                performer = User.objects.create_user(f'{title}-{n}-{a}', password='pw')
+                EventApplication.objects.create(
+                    event=event, performer=performer, talent_type=talent, status='accepted' if a == 0 else 'pending'
+                )
+        return event
+
+    def detail_queries(self, event):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('event_detail', args=[event.id]))
+        return len(queries), response
+
+    def test_query_count_does_not_grow_with_needs_or_applicants(self):
+        self.client.force_login(self.organizer)
+        small, _ = self.detail_queries(self.event_with_applicants('small', 1, 1))
+        large, response = self.detail_queries(self.event_with_applicants('large', 5, 4))
+        self.assertEqual(small, large)
+        self.assertContains(response, 'large-4-3')
+        self.assertEqual(len(response.context['accepted_performers']), 5)
+        self.assertEqual(response.context['pending_count'], 15)
+
+
+class EventEditTests(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('organizer', password='pw')
+        self.client.force_login(self.organizer)
+
+    def edit(self, event, talents, action='publish'):
+        # talents: (id or '', talent_type, quantity, description) rows as the form posts them
+        return self.client.post(reverse('edit_event', args=[event.id]), {
+            'title': event.title,
+            'description': event.description,
+            'date': event.date.isoformat(),
+            'start_time': '10:00',
+            'end_time': '12:00',
+            'action': action,
+            'talent_id[]': [row[0] for row in talents],
+            'talent_type[]': [row[1] for row in talents],
+            'quantity_needed[]': [row[2] for row in talents],
+            'talent_description[]': [row[3] for row in talents],
+        })
+
+    def test_edit_keeps_applications_on_unchanged_and_updated_needs(self):
+        event = make_event(self.organizer, 'Gig')
+        lead = EventTalent.objects.create(event=event, talent_type='dancer', quantity_needed=1, description='Lead')
+        band = EventTalent.objects.create(event=event, talent_type='musician', quantity_needed=1, description='Band')
+        dropped = EventTalent.objects.create(event=event, talent_type='other', quantity_needed=1, description='Host')
+        performer = User.objects.create_user('performer', password='pw')
+        kept = [
+            EventApplication.objects.create(event=event, performer=performer, talent_type=lead).id,
+            EventApplication.objects.create(event=event, performer=performer, talent_type=band).id,
+        ]
+        EventApplication.objects.create(event=event, performer=performer, talent_type=dropped)
+
+        self.edit(event, [
+            (lead.id, 'dancer', 1, 'Lead'),
+            (band.id, 'musician', 3, 'Band'),
+            ('', 'other', 2, 'Stagehands'),
+        ])
+        needs = list(event.talent_needs.order_by('id').values_list('id', 'talent_type', 'quantity_needed', 'description'))
+        self.assertEqual(needs[:2], [(lead.id, 'dancer', 1, 'Lead'), (band.id, 'musician', 3, 'Band')])
+        self.assertEqual(needs[2][1:], ('other', 2, 'Stagehands'))
+        self.assertFalse(EventTalent.objects.filter(id=dropped.id).exists())
+        self.assertEqual(sorted(EventApplication.objects.values_list('id', flat=True)), kept)
+
+    @override_settings(JOBS_EAGER=True)
+    def test_cancelling_notifies_applicants_who_want_updates(self):
+        event = make_event(self.organizer, 'Gig')
+        talent = EventTalent.objects.create(event=event, talent_type='dancer', description='Lead')
+        performers = [User.objects.create_user(f'performer{i}', password='pw') for i in range(3)]
+        for performer in performers:
+            EventApplication.objects.create(event=event, performer=performer, talent_type=talent)
+        Profile.objects.filter(user=performers[0]).update(application_updates=False)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.edit(event, [(talent.id, 'dancer', 1, 'Lead')], action='cancel')
+        notified = Notification.objects.filter(title='Event cancelled').values_list('user_id', flat=True)
+        self.assertEqual(sorted(notified), [performers[1].id, performers[2].id])
+
+
+class TimelineTests(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('organizer', password='pw')
+        self.performer = User.objects.create_user('performer', password='pw')
+        self.venue = Venue.objects.create(name='Hall', address='a', city='c', state='s', zip_code='1')
+        self.event = make_event(self.organizer, 'Gig', day=date(2030, 1, 1), venue=self.venue)
+        self.talent = EventTalent.objects.create(event=self.event, talent_type='dancer', description='Lead')
+
+    def entries(self, *kinds):
+        return sorted(
+            TimelineEntry.objects.filter(kind__in=kinds)
+            .values_list('user_id', 'kind', 'title', 'location')
+        )
+
+    def test_signals_follow_events_and_applications(self):
+        application = EventApplication.objects.create(event=self.event, performer=self.performer, talent_type=self.talent)
+        self.assertEqual(self.entries('performing'), [])
+        application.status = 'accepted'
+        application.save()
+        self.venue.name = 'Big Hall'
+        self.venue.save()
+        self.assertEqual(self.entries('organizing', 'performing'), [
+            (self.organizer.id, 'organizing', 'Gig', 'Big Hall'),
+            (self.performer.id, 'performing', 'Gig', 'Big Hall'),
+        ])
+
+        self.event.status = 'cancelled'
+        self.event.save()
+        self.assertEqual(self.entries('organizing', 'performing'), [])
+        self.event.status = 'published'
+        self.event.save()
+        self.talent.delete()
+        self.assertEqual(self.entries('organizing', 'performing'), [(self.organizer.id, 'organizing', 'Gig', 'Big Hall')])
+        self.event.delete()
+        self.assertEqual(self.entries('organizing', 'performing'), [])
+
+    def test_rebuild_matches_incremental_maintenance(self):
+        EventApplication.objects.create(event=self.event, performer=self.performer, talent_type=self.talent, status='accepted')
+        CalendarEvent.objects.create(
+            user=self.performer, title='Rehearsal', event_type='other',
+            date=self.event.date, start_time=time(8), end_time=time(9), related_event=self.event,
+        )
+        Availability.objects.create(user=self.performer, date=self.event.date, start_time=time(13), end_time=time(15))
+        fields = ('user_id', 'kind', 'title', 'date', 'start_time', 'end_time', 'location', 'event_id', 'source_id')
+        maintained = sorted(TimelineEntry.objects.values_list(*fields))
+        self.assertEqual(len(maintained), 4)
+        self.assertEqual(timeline.rebuild(), 4)
+        self.assertEqual(sorted(TimelineEntry.objects.values_list(*fields)), maintained)
+        self.assertEqual(timeline.rebuild([self.performer.id]), 3)
+        self.assertEqual(sorted(TimelineEntry.objects.values_list(*fields)), maintained)
+
+
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('organizer', password='pw')
+        self.url = reverse('calendar_ics', args=['organizer', ics.feed_token(self.organizer)])
+        self.gig = make_event(self.organizer, 'Gig, late; ' + 'long ' * 20 + 'é' * 30, day=date(2030, 1, 1))
+        make_event(self.organizer, 'Matinee', day=date(2030, 1, 2))
+
+    def test_feed_escapes_and_folds_lines(self):
+        response = self.client.get(self.url)
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+        self.assertIn('SUMMARY:[Organizing] Gig\\, late\\;', body)
+        for line in body.split('\r\n'):
+            self.assertLessEqual(len(line.encode()), 75)
+
+    def test_wrong_token_is_not_found(self):
+        self.assertEqual(self.client.get(reverse('calendar_ics', args=['organizer', 'wrong'])).status_code, 404)
+
+    def test_unchanged_feed_answers_304_without_reading_events(self):
+        etag = self.client.get(self.url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        tables = ('"home_event"', '"home_eventapplication"', '"home_eventtalent"')
+        self.assertFalse([query['sql'] for query in queries if any(table in query['sql'] for table in tables)])
+
+        self.gig.delete()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class CatalogImportTests(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('organizer', password='pw')
+
+    def run_import(self, kind, text, fmt='csv', **options):
+        return CatalogImporter(kind, **options).run(read_rows(io.StringIO(text), fmt))
+
+    def test_events_upsert_by_natural_key(self):
+        header = 'organizer,title,date,start_time,end_time,description,status\n'
+        stats = self.run_import('events', header + (
+            'organizer,Gig,2030-01-01,10:00,12:00,First,published\n'
+            'organizer,Gig,2030-01-02,10:00,12:00,Next day,published\n'
+            'nobody,Gig,2030-01-01,10:00,12:00,,published\n'
+        ), batch_size=2)
+        self.assertEqual((stats.created, len(stats.errors)), (2, 1))
+        self.assertEqual(stats.errors[0][0], 3)
+        event = Event.objects.get(date=date(2030, 1, 1))
+        stamped = event.updated_at
+
+        # Without --update existing rows are left alone
+        rows = header + 'organizer,Gig,2030-01-01,10:00,13:00,Changed,published\n'
+        stats = self.run_import('events', rows)
+        self.assertEqual((stats.created, stats.updated, stats.unchanged), (0, 0, 1))
+        stats = self.run_import('events', rows, update=True)
+        self.assertEqual((stats.created, stats.updated), (0, 1))
+        event.refresh_from_db()
+        self.assertEqual((event.end_time, event.description), (time(13), 'Changed'))
+        self.assertGreater(event.updated_at, stamped)
+        self.assertEqual(Event.objects.count(), 2)
+        # Imported events are searchable without signals
+        self.assertEqual(ranked_event_ids('changed', Event.objects.all()), [event.id])
+
+    def test_talent_matches_event_and_type(self):
+        event = make_event(self.organizer, 'Gig', day=date(2030, 1, 1))
+        row = {'organizer': 'organizer', 'title': 'Gig', 'date': '2030-01-01', 'start_time': '10:00', 'talent_type': 'dancer'}
+        lines = [json.dumps({**row, 'quantity_needed': 2}), json.dumps({**row, 'quantity_needed': 4})]
+        self.assertEqual(self.run_import('talent', '\n'.join(lines), 'jsonl').created, 1)
+        self.assertEqual(self.run_import('talent', lines[0], 'jsonl', update=True).updated, 1)
+        self.assertEqual(list(event.talent_needs.values_list('talent_type', 'quantity_needed')), [('dancer', 2)])
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('organizer', password='pw')
+        self.other = User.objects.create_user('other', password='pw')
+        Profile.objects.filter(user__in=[self.organizer, self.other]).update(role='organizer')
+        self.event = make_event(self.organizer, '=HYPERLINK("http://example.com")', day=date(2030, 1, 1))
+        talent = EventTalent.objects.create(event=self.event, talent_type='dancer', description='Lead')
+        for i in range(3):
+            performer = User.objects.create_user(f'performer{i}', password='pw', email=f'p{i}@example.com')
+            EventApplication.objects.create(event=self.event, performer=performer, talent_type=talent)
+
+    def export(self, url):
+        response = self.client.get(url)
+        return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_export_escapes_formulas_and_leaves_out_emails(self):
+        self.client.force_login(self.organizer)
+        rows = self.export(reverse('export_applications'))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1][1], "'=HYPERLINK(\"http://example.com\")")
+        self.assertEqual([row[7] for row in rows[1:]], ['performer0', 'performer1', 'performer2'])
+        self.assertNotIn('@example.com', str(rows))
+        self.assertEqual(len(self.export(reverse('export_event_applications', args=[self.event.id]))), 4)
+
+    def test_only_the_events_organizer_can_export_it(self):
+        self.client.force_login(self.other)
+        response = self.client.get(reverse('export_event_applications', args=[self.event.id]))
+        self.assertRedirects(response, reverse('event_detail', args=[self.event.id]))
+        # Their own export has only the header
+        self.assertEqual(len(self.export(reverse('export_applications'))), 1)
+
+        self.client.force_login(User.objects.get(username='performer0'))
+        self.assertRedirects(self.client.get(reverse('export_applications')), reverse('event_list'))
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.organizer = User.objects.create_user('organizer', password='pw')
+        Profile.objects.filter(user=self.organizer).update(role='organizer')
+        self.venue = Venue.objects.create(name='Blue Hall', address='a', city='c', state='s', zip_code='1')
+        self.event = make_event(self.organizer, 'Gig', venue=self.venue)
+
+    def test_cached_applicant_lists_follow_application_changes(self):
+        talent = EventTalent.objects.create(event=self.event, talent_type='dancer', description='Lead')
+        performer = User.objects.create_user('performer', password='pw')
+        application = EventApplication.objects.create(event=self.event, performer=performer, talent_type=talent)
+        self.client.force_login(self.organizer)
+        url = reverse('event_detail', args=[self.event.id])
+        self.assertContains(self.client.get(url), 'Accept all pending')
+
+        # A warm render reads no applications at all
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse([query for query in queries if '"home_eventapplication"' in query['sql']])
+
+        self.client.post(reverse('update_application_status', args=[self.event.id, application.id, 'accepted']))
+        response = self.client.get(url)
+        self.assertNotContains(response, 'Accept all pending')
+        self.assertContains(response, '<p class="text-xs text-gray-500">Accepted</p>', html=True)
+
+    def test_cards_and_details_follow_event_and_venue_edits(self):
+        self.assertContains(self.client.get(reverse('event_list')), 'Gig')
+        self.assertContains(self.client.get(reverse('event_detail', args=[self.event.id])), 'Blue Hall')
+        self.event.title = 'Late Gig'
+        self.event.save()
+        self.venue.name = 'Red Room'
+        self.venue.save()
+        self.assertContains(self.client.get(reverse('event_list')), 'Late Gig')
+        self.assertContains(self.client.get(reverse('event_detail', args=[self.event.id])), 'Red Room')
+
+
+class ReferenceCacheTests(TestCase):
+    def setUp(self):
+        # Versions restart with each test's rolled-back database
+        reference._cache[0] = (None, [], [])
+
+    def test_reads_reload_only_after_a_change(self):
+        Category.objects.create(name='Music')
+        version, categories, venues = reference.reference_data()
+        self.assertEqual(([category.name for category in categories], venues), (['Music'], []))
+        # Only the version stamp is read while nothing changes
+        with self.assertNumQueries(1):
+            self.assertEqual(reference.reference_data()[0], version)
+
+        venue = Venue.objects.create(name='Hall', address='a', city='c', state='s', zip_code='1')
+        newer, _, venues = reference.reference_data()
+        self.assertGreater(newer, version)
+        self.assertEqual(venues, [venue])
+        venue.delete()
+        self.assertEqual(reference.reference_data()[2], [])
+
+    def test_imports_bump_the_version(self):
+        version = reference.current_version()
+        CatalogImporter('categories').run([{'name': 'Dance', 'description': ''}])
+        self.assertGreater(reference.current_version(), version)
+        self.assertEqual([category.name for category in reference.reference_data()[1]], ['Dance'])
+
+
+class AvailabilityTests(TestCase):
+    def test_merge_intervals_joins_overlapping_and_touching_slots(self):
+        day = date(2030, 1, 1)
+        slots = [
+            (day, time(9), time(10)),
+            (day, time(10), time(11)),
+            (day, time(10, 30), time(12)),
+            (day, time(13), time(14)),
+            (day + timedelta(days=1), time(9), time(10)),
+        ]
+        blocks = [block[:3] for block in merge_intervals(slots)]
+        self.assertEqual(blocks, [
+            (day, time(9), time(12)),
+            (day, time(13), time(14)),
+            (day + timedelta(days=1), time(9), time(10)),
+        ])
+
+    def test_expand_rules_honours_validity_and_exceptions(self):
+        monday = date(2030, 1, 7)
+        rule = AvailabilityRule(
+            id=1, weekday=0, start_time=time(18), end_time=time(20),
+            valid_from=monday, valid_until=monday + timedelta(days=21), note='Evenings',
+        )
+        # The second Monday is cancelled; a morning exception leaves the third alone
+        exceptions = {
+            monday + timedelta(days=7): [(None, None)],
+            monday + timedelta(days=14): [(time(8), time(9))],
+        }
+        days = [slot[0] for slot in expand_rules([rule], exceptions, monday - timedelta(days=7), monday + timedelta(days=35))]
+        self.assertEqual(days, [monday, monday + timedelta(days=14), monday + timedelta(days=21)])
+
+    def test_expand_rules_skips_occurrences_hit_by_partial_exceptions(self):
+        monday = date(2030, 1, 7)
+        rule = AvailabilityRule(id=1, weekday=0, start_time=time(18), end_time=time(20), valid_from=monday)
+        exceptions = {monday: [(time(19), time(21))]}
+        self.assertEqual(list(expand_rules([rule], exceptions, monday, monday + timedelta(days=1))), [])
+
+
+class BookingTests(TestCase):
+    def test_interval_index_matches_brute_force(self):
+        index = IntervalIndex()
+        intervals = [(8, 10), (9, 12), (14, 15), (11, 13), (20, 23)]
+        for start, end in intervals:
+            index.add(1, 'day', time(start), time(end), f'{start}-{end}')
+        for start in range(0, 23):
+            for end in range(start + 1, 24):
+                expected = any(s < end and start < e for s, e in intervals)
+                self.assertEqual(index.conflict(1, 'day', time(start), time(end)) is not None, expected, (start, end))
+
+    def test_interval_index_is_per_performer_and_day(self):
+        index = IntervalIndex()
+        index.add(1, 'mon', time(10), time(12), 'Gig')
+        self.assertEqual(index.conflict(1, 'mon', time(11), time(13)), 'Gig')
+        self.assertIsNone(index.conflict(2, 'mon', time(11), time(13)))
+        self.assertIsNone(index.conflict(1, 'tue', time(11), time(13)))
+        # Back-to-back bookings don't overlap
+        self.assertIsNone(index.conflict(1, 'mon', time(12), time(13)))
+
+    def test_booking_index_counts_only_published_events(self):
+        organizer = User.objects.create_user('organizer', password='pw')
+        performer = User.objects.create_user('performer', password='pw')
+        day = date(2030, 1, 1)
+        for status in ('published', 'cancelled'):
+            event = make_event(organizer, status, day=day, start=time(10), end=time(12), status=status)
+            talent = EventTalent.objects.create(event=event, talent_type='musician')
+            EventApplication.objects.create(event=event, performer=performer, talent_type=talent, status='accepted')
+        index = booking_index([performer.id], [day])
+        self.assertEqual(index.conflict(performer.id, day, time(11), time(13)), 'published')
+        events = Event.objects.filter(status='published')
+        index = booking_index([performer.id], [day], exclude_event=events.get())
+        self.assertIsNone(index.conflict(performer.id, day, time(11), time(13)))
+
+
+def routed_view(request):
+    return HttpResponse(PrimaryReplicaRouter().db_for_read(Event))
+
+
+# SimpleTestCase: TestCase's wrapping transaction would keep reads on the primary
+@override_settings(REPLICA_DATABASES=['replica_1'], REPLICA_PIN_SECONDS=10)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.view = ReadYourWritesMiddleware(replica_reads(routed_view))
+
+    def test_reads_go_to_replica_only_inside_decorated_views(self):
+        self.assertEqual(self.view(self.factory.get('/')).content, b'replica_1')
+        self.assertEqual(PrimaryReplicaRouter().db_for_read(Event), 'default')
+
+    def test_unsafe_methods_read_from_primary_and_pin(self):
+        response = self.view(self.factory.post('/'))
+        self.assertEqual(response.content, b'default')
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 10)
+
+    def test_pinned_client_reads_from_primary(self):
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        self.assertEqual(self.view(request).content, b'default')
+
+    def test_write_during_get_pins_later_reads(self):
+        def writing_view(request):
+            router = PrimaryReplicaRouter()
+            before = router.db_for_read(Event)
+            router.db_for_write(Event)
+            return HttpResponse(f'{before},{router.db_for_read(Event)}')
+
+        response = ReadYourWritesMiddleware(replica_reads(writing_view))(self.factory.get('/'))
+        self.assertEqual(response.content, b'replica_1,default')
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_plain_get_does_not_pin(self):
+        self.assertNotIn(PIN_COOKIE, self.view(self.factory.get('/')).cookies)
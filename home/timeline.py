@@ -0,0 +1,165 @@
+"""Maintenance of the per-user TimelineEntry read model.
+
+Calendar reads go to one ``(user, date, start_time)`` range scan on
+TimelineEntry instead of reassembling events, applications, calendar entries
+and availability each time. The handlers in ``home.signals`` keep the table
+in step with single-row changes; code that writes in bulk (which sends no
+signals) calls the matching ``sync_*`` function itself, and
+``manage.py rebuild_timeline`` regenerates everything.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import CalendarEvent
+
+from .models import Availability, Event, EventApplication, TimelineEntry
+
+EVENT_KINDS = ('organizing', 'performing')
+BATCH_SIZE = 1000
+
+
+def _event_entries(events):
+    """Build organizing/performing entries for published event rows."""
+    events = {row['id']: row for row in events}
+    entries = []
+    for row in events.values():
+        entries.append(_entry_from_event(row, row['organizer_id'], 'organizing'))
+    performers = (
+        EventApplication.objects
+        .filter(event_id__in=events, status='accepted')
+        .values_list('event_id', 'performer_id')
+        .distinct()
+    )
+    for event_id, performer_id in performers:
+        entries.append(_entry_from_event(events[event_id], performer_id, 'performing'))
+    return entries
+
+
+def _entry_from_event(row, user_id, kind):
+    return TimelineEntry(
+        user_id=user_id,
+        date=row['date'],
+        start_time=row['start_time'],
+        end_time=row['end_time'],
+        kind=kind,
+        title=row['title'],
+        location=row['venue__name'] or '',
+        event_id=row['id'],
+    )
+
+
+def _published_events(queryset):
+    return queryset.filter(status='published').values(
+        'id', 'title', 'date', 'start_time', 'end_time', 'organizer_id', 'venue__name'
+    )
+
+
+def _calendar_entry(entry):
+    return TimelineEntry(
+        user_id=entry.user_id,
+        date=entry.date,
+        start_time=entry.start_time,
+        end_time=entry.end_time,
+        kind='calendar',
+        title=entry.title,
+        location=entry.location,
+        event_id=entry.related_event_id,
+        source_id=entry.id,
+    )
+
+
+def _availability_entry(slot):
+    # The slot's note doubles as its title
+    return TimelineEntry(
+        user_id=slot.user_id,
+        date=slot.date,
+        start_time=slot.start_time,
+        end_time=slot.end_time,
+        kind='availability',
+        title=slot.note,
+        source_id=slot.id,
+    )
+
+
+def sync_event(event_id):
+    """Rewrite the organizing/performing entries of one event."""
+    sync_events([event_id])
+
+
+def sync_events(event_ids):
+    """Rewrite the organizing/performing entries of the given events, in batches."""
+    event_ids = sorted(event_ids)
+    with transaction.atomic():
+        for start in range(0, len(event_ids), BATCH_SIZE):
+            batch = event_ids[start:start + BATCH_SIZE]
+            TimelineEntry.objects.filter(event_id__in=batch, kind__in=EVENT_KINDS).delete()
+            TimelineEntry.objects.bulk_create(_event_entries(_published_events(Event.objects.filter(id__in=batch))))
+
+
+def remove_event(event_id):
+    TimelineEntry.objects.filter(event_id=event_id, kind__in=EVENT_KINDS).delete()
+
+
+def rename_venue(venue_id, name):
+    # updated_at moves too: calendar feed ETags are derived from it
+    TimelineEntry.objects.filter(
+        kind__in=EVENT_KINDS,
+        event_id__in=Event.objects.filter(venue_id=venue_id).values('id'),
+    ).update(location=name, updated_at=timezone.now())
+
+
+def sync_calendar_entry(entry):
+    with transaction.atomic():
+        remove_source('calendar', entry.id)
+        _calendar_entry(entry).save()
+
+
+def sync_availability_slot(slot):
+    with transaction.atomic():
+        remove_source('availability', slot.id)
+        _availability_entry(slot).save()
+
+
+def remove_source(kind, source_id):
+    TimelineEntry.objects.filter(kind=kind, source_id=source_id).delete()
+
+
+def sync_user_availability(user_id):
+    """Rewrite a user's one-off availability entries, e.g. after bulk writes."""
+    with transaction.atomic():
+        TimelineEntry.objects.filter(user_id=user_id, kind='availability').delete()
+        TimelineEntry.objects.bulk_create(
+            [_availability_entry(slot) for slot in Availability.objects.filter(user_id=user_id)],
+            batch_size=BATCH_SIZE,
+        )
+
+
+def rebuild(user_ids=None):
+    """Regenerate the timeline from the source tables. Returns the number of entries."""
+    entries = TimelineEntry.objects.all()
+    events = Event.objects.all()
+    calendar = CalendarEvent.objects.all()
+    slots = Availability.objects.all()
+    if user_ids is not None:
+        user_ids = set(user_ids)
+        entries = entries.filter(user_id__in=user_ids)
+        calendar = calendar.filter(user_id__in=user_ids)
+        slots = slots.filter(user_id__in=user_ids)
+        events = events.filter(
+            id__in=EventApplication.objects.filter(performer_id__in=user_ids, status='accepted').values('event_id')
+        ) | events.filter(organizer_id__in=user_ids)
+
+    with transaction.atomic():
+        entries.delete()
+        new_entries = []
+        rows = list(_published_events(events).order_by('id'))
+        # Applications are looked up per batch of events to bound IN (...) lists
+        for start in range(0, len(rows), BATCH_SIZE):
+            new_entries += [
+                entry for entry in _event_entries(rows[start:start + BATCH_SIZE])
+                if user_ids is None or entry.user_id in user_ids
+            ]
+        new_entries += [_calendar_entry(entry) for entry in calendar.iterator()]
+        new_entries += [_availability_entry(slot) for slot in slots.iterator()]
+        TimelineEntry.objects.bulk_create(new_entries, batch_size=BATCH_SIZE)
+    return len(new_entries)
@@ -11,11 +11,15 @@ urlpatterns = [
     path('events/<int:event_id>/apply/<int:talent_id>/', views.apply_for_event, name='apply_for_event'),
     path('events/<int:event_id>/withdraw/<int:talent_id>/', views.withdraw_application, name='withdraw_application'),
     path('events/<int:event_id>/application/<int:application_id>/<str:new_status>/', views.update_application_status, name='update_application_status'),
+    path('events/<int:event_id>/applications/accept-pending/', views.accept_pending_applications, name='accept_pending_applications'),
+    path('events/export/applications.csv', views.export_applications, name='export_applications'),
+    path('events/<int:event_id>/export/applications.csv', views.export_applications, name='export_event_applications'),
     path('debug/user/', views.debug_user, name='debug_user'),
     path('events/json/', views.events_json, name='events_json'),
     path('events/json/<str:username>/', views.events_json, name='events_json_user'),
     path('calendar/', views.event_list, name='calendar'),
     path('calendar/<str:username>/', views.event_list, name='user_calendar'),
+    path('calendar/<str:username>/<str:token>.ics', views.calendar_ics, name='calendar_ics'),
     path('availability/json/', views.availability_json, name='availability_json'),
     path('availability/json/<str:username>/', views.availability_json, name='availability_json_user'),
     path('availability/create/', views.create_availability, name='create_availability'),
@@ -1,12 +1,38 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-from .models import Event, Category, Venue, EventTalent, EventApplication, Availability
-from django.db.models import Q
-from django.http import HttpResponse, JsonResponse
+from .models import Event, EventTalent, EventApplication, Availability
+from django.db import transaction
+from django.db.models import Count
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date
 from django.views.decorators.csrf import csrf_exempt
-from datetime import datetime
+from collections import defaultdict
+from django.utils.functional import SimpleLazyObject
+from datetime import date as date_cls, datetime, time
+from campusbooking.db_router import replica_reads
+from jobs.queue import enqueue
+from .pagination import decode_cursor, encode_cursor, paginate
+from .feeds import availability_feed, event_feed, parse_window
+from .notifications import applicant_ids, event_change
+from .search import search_page
+from .bookings import booking_index
+from .streaming import streaming_content
+from . import exports, ics, reference, timeline
+
+EVENTS_PAGE_SIZE = 24
+EVENT_LIST_ORDERING = ('date', 'start_time', 'id')
+EVENT_CURSOR_PARSERS = (date_cls.fromisoformat, time.fromisoformat, int)
+# Event status set by each submit button on the event form
+EVENT_ACTION_STATUS = {
+    'draft': 'draft',
+    'publish': 'published',
+    'cancel': 'cancelled',
+}
 
 # Create your views here.
 
@@ -33,6 +59,7 @@ def debug_user(request):
 def landing_page(request):
     return render(request, 'home/landing_page.html')
 
+@replica_reads
 def event_list(request, username=None):
     if username:
         from django.contrib.auth.models import User
@@ -40,73 +67,176 @@ def event_list(request, username=None):
     else:
         calendar_user = request.user
         
-    # Get all published events for the event list view
-    events = Event.objects.filter(status='published')
-    
-    # Apply filters
+    # Check if this is a calendar view
+    is_calendar_view = request.path.startswith('/calendar/')
+
     category = request.GET.get('category')
     date = request.GET.get('date')
     location = request.GET.get('location')
     search = request.GET.get('search')
-    
-    if category:
-        events = events.filter(category_id=category)
-    if date:
-        events = events.filter(date=date)
-    if location:
-        events = events.filter(venue__city__icontains=location)
-    if search:
-        events = events.filter(
-            Q(title__icontains=search) |
-            Q(description__icontains=search)
-        )
-    
-    categories = Category.objects.all()
-    venues = Venue.objects.all()
-    is_owner = request.user.is_authenticated and request.user == calendar_user
-    
-    # Check if this is a calendar view
-    is_calendar_view = request.path.startswith('/calendar/')
-    
+    include_past = request.GET.get('past') == '1'
+
+    reference_version, categories, venues = reference.reference_data()
     context = {
-        'events': events,
         'categories': categories,
         'venues': venues,
+        'reference_version': reference_version,
         'current_category': category,
         'current_date': date,
         'current_location': location,
         'current_search': search,
-        'is_organizer': request.user.is_authenticated and request.user.profile.role == 'organizer',
-        'is_performer': request.user.is_authenticated and request.user.profile.role == 'performer',
+        'include_past': include_past,
         'calendar_username': calendar_user.username if calendar_user else None,
-        'is_owner': is_owner,
+        'is_owner': request.user.is_authenticated and request.user == calendar_user,
         'is_calendar_view': is_calendar_view,
     }
+
+    if is_calendar_view and context['is_owner']:
+        context['ics_url'] = request.build_absolute_uri(
+            reverse('calendar_ics', args=[calendar_user.username, ics.feed_token(calendar_user)])
+        )
+
+    # The calendar template loads its events from events_json, so only the
+    # catalogue view needs the event query.
+    if not is_calendar_view:
+        events = Event.objects.filter(status='published').select_related('venue')
+
+        # Apply filters
+        if category:
+            events = events.filter(category_id=category)
+        if date:
+            events = events.filter(date=date)
+        elif not include_past:
+            events = events.filter(date__gte=timezone.now().date())
+        if location:
+            events = events.filter(venue__city__icontains=location)
+
+        cursor = request.GET.get('cursor')
+        if search:
+            # Search results are ranked by relevance within the filtered
+            # events and paged by position in that ranking.
+            offset = max((decode_cursor(cursor, (int,)) or [0])[0], 0)
+            page, next_offset = search_page(events, search, offset, EVENTS_PAGE_SIZE)
+            next_values = [next_offset] if next_offset is not None else None
+        else:
+            # Keyset pagination on (date, start_time, id) so deep pages cost
+            # the same index range scan as the first one.
+            page, next_values = paginate(
+                events,
+                EVENT_LIST_ORDERING,
+                decode_cursor(cursor, EVENT_CURSOR_PARSERS),
+                EVENTS_PAGE_SIZE,
+            )
+        params = request.GET.copy()
+        params.pop('cursor', None)
+        context['events'] = page
+        context['is_first_page'] = not cursor
+        context['first_page_query'] = params.urlencode()
+        if next_values:
+            params['cursor'] = encode_cursor(next_values)
+            context['next_page_query'] = params.urlencode()
     
     # Use different templates for calendar and event list views
     template = 'home/event_list.html' if is_calendar_view else 'home/events.html'
     return render(request, template, context)
 
+@replica_reads
 def event_detail(request, event_id):
-    event = get_object_or_404(Event, id=event_id)
-    talent_needs = event.talent_needs.all()
-    accepted_performers = EventApplication.objects.filter(
-        event=event,
-        status='accepted'
-    ).select_related('performer', 'talent_type')
+    event = get_object_or_404(Event.objects.select_related('venue', 'organizer'), id=event_id)
+    talent_needs = list(event.talent_needs.all())
+    talents_by_id = {talent.id: talent for talent in talent_needs}
+
+    def load_applications():
+        # Group every application by talent need in one pass instead of
+        # re-querying per need (and per performer) from the template.
+        applications = list(event.applications.select_related('performer'))
+        by_talent = defaultdict(list)
+        for application in applications:
+            application.talent_type = talents_by_id[application.talent_type_id]
+            by_talent[application.talent_type_id].append(application)
+        return {
+            'by_talent': by_talent,
+            'accepted': [application for application in applications if application.status == 'accepted'],
+            'pending': sum(1 for application in applications if application.status == 'pending'),
+        }
+
+    # Applicant lists render inside cached fragments, so they are only
+    # loaded when a fragment misses the cache.
+    applications = SimpleLazyObject(load_applications)
+    my_applications = {}
+    if request.is_performer:
+        my_applications = {
+            application.talent_type_id: application
+            for application in event.applications.filter(performer=request.user)
+        }
+    for talent in talent_needs:
+        talent.event_applications = SimpleLazyObject(lambda talent_id=talent.id: applications['by_talent'][talent_id])
+        talent.my_application = my_applications.get(talent.id)
     
     context = {
         'event': event,
         'talent_needs': talent_needs,
-        'accepted_performers': accepted_performers,
-        'is_organizer': request.user.is_authenticated and request.user.profile.role == 'organizer',
-        'is_performer': request.user.is_authenticated and request.user.profile.role == 'performer',
+        'reference_version': reference.current_version(),
+        'accepted_performers': SimpleLazyObject(lambda: applications['accepted']),
+        'pending_count': SimpleLazyObject(lambda: applications['pending']),
     }
     return render(request, 'home/event_detail.html', context)
 
+def _posted_talent_needs(request):
+    """Return ``(id, talent_type, quantity, description)`` for each submitted talent row.
+
+    ``id`` is None for rows added in the browser.
+    """
+    talent_ids = request.POST.getlist('talent_id[]')
+    talent_types = request.POST.getlist('talent_type[]')
+    quantities = request.POST.getlist('quantity_needed[]')
+    descriptions = request.POST.getlist('talent_description[]')
+
+    rows = []
+    for i in range(len(talent_types)):
+        talent_id = talent_ids[i] if i < len(talent_ids) else ''
+        rows.append((
+            int(talent_id) if talent_id.isdigit() else None,
+            talent_types[i],
+            int(quantities[i]),
+            descriptions[i],
+        ))
+    return rows
+
+def _sync_talent_needs(event, rows):
+    """Reconcile the event's talent needs with the submitted rows.
+
+    Unchanged needs are left alone so their applications survive an edit;
+    only needs removed from the form are deleted.
+    """
+    existing = {talent.id: talent for talent in event.talent_needs.all()}
+    to_create = []
+    to_update = []
+    for talent_id, talent_type, quantity, description in rows:
+        talent = existing.pop(talent_id, None)
+        if talent is None:
+            to_create.append(EventTalent(
+                event=event, talent_type=talent_type, quantity_needed=quantity, description=description
+            ))
+        elif (talent.talent_type, talent.quantity_needed, talent.description) != (talent_type, quantity, description):
+            talent.talent_type = talent_type
+            talent.quantity_needed = quantity
+            talent.description = description
+            to_update.append(talent)
+
+    if existing:
+        EventTalent.objects.filter(id__in=existing).delete()
+    if to_update:
+        EventTalent.objects.bulk_update(to_update, ['talent_type', 'quantity_needed', 'description'])
+    if to_create:
+        EventTalent.objects.bulk_create(to_create)
+    if to_update or to_create:
+        # Bulk writes send no signals; deletes above already bumped it
+        Event.bump_applications_version(event.id)
+
 @login_required
 def create_event(request):
-    if request.user.profile.role != 'organizer':
+    if not request.is_organizer:
         messages.error(request, 'Only organizers can create events.')
         return redirect('event_list')
     
@@ -122,39 +252,32 @@ def create_event(request):
         allow_manual_invites = request.POST.get('allow_manual_invites') == 'on'
         action = request.POST.get('action')
         
-        # Create event
-        event = Event.objects.create(
-            title=title,
-            description=description,
-            category_id=category_id,
-            venue_id=venue_id,
-            date=date,
-            start_time=start_time,
-            end_time=end_time,
-            organizer=request.user,
-            status='draft' if action == 'draft' else 'published',
-            allow_manual_invites=allow_manual_invites
-        )
-        
-        # Handle talent needs
-        talent_types = request.POST.getlist('talent_type[]')
-        quantities = request.POST.getlist('quantity_needed[]')
-        descriptions = request.POST.getlist('talent_description[]')
-        
-        for i in range(len(talent_types)):
-            EventTalent.objects.create(
-                event=event,
-                talent_type=talent_types[i],
-                quantity_needed=quantities[i],
-                description=descriptions[i]
+        with transaction.atomic():
+            # Create event
+            event = Event.objects.create(
+                title=title,
+                description=description,
+                category_id=category_id,
+                venue_id=venue_id,
+                date=date,
+                start_time=start_time,
+                end_time=end_time,
+                organizer=request.user,
+                status='draft' if action == 'draft' else 'published',
+                allow_manual_invites=allow_manual_invites
             )
+            EventTalent.objects.bulk_create([
+                EventTalent(event=event, talent_type=talent_type, quantity_needed=quantity, description=description)
+                for _, talent_type, quantity, description in _posted_talent_needs(request)
+            ])
         
         messages.success(request, 'Event created successfully!')
         return redirect('event_detail', event_id=event.id)
     
+    _, categories, venues = reference.reference_data()
     context = {
-        'categories': Category.objects.all(),
-        'venues': Venue.objects.all(),
+        'categories': categories,
+        'venues': venues,
         'talent_types': EventTalent.TALENT_TYPE_CHOICES,
     }
     return render(request, 'home/event_form.html', context)
@@ -178,37 +301,33 @@ def edit_event(request, event_id):
         event.end_time = request.POST.get('end_time')
         event.allow_manual_invites = request.POST.get('allow_manual_invites') == 'on'
         action = request.POST.get('action')
-        event.status = 'draft' if action == 'draft' else 'published'
-        event.save()
-        
-        # Handle talent needs
-        event.talent_needs.all().delete()  # Remove existing talent needs
-        talent_types = request.POST.getlist('talent_type[]')
-        quantities = request.POST.getlist('quantity_needed[]')
-        descriptions = request.POST.getlist('talent_description[]')
-        
-        for i in range(len(talent_types)):
-            EventTalent.objects.create(
-                event=event,
-                talent_type=talent_types[i],
-                quantity_needed=quantities[i],
-                description=descriptions[i]
-            )
+        previous_status = event.status
+        event.status = EVENT_ACTION_STATUS.get(action, 'published')
+        with transaction.atomic():
+            # Collect recipients before removed talent needs take their applications with them
+            recipient_ids = applicant_ids(event)
+            event.save()
+            _sync_talent_needs(event, _posted_talent_needs(request))
+
+            change = event_change(previous_status, event.status)
+            if change:
+                enqueue('home.tasks.send_event_change', event_id=event.id, change=change, recipient_ids=recipient_ids)
         
         messages.success(request, 'Event updated successfully!')
         return redirect('event_detail', event_id=event.id)
     
+    _, categories, venues = reference.reference_data()
     context = {
         'event': event,
-        'categories': Category.objects.all(),
-        'venues': Venue.objects.all(),
+        'categories': categories,
+        'venues': venues,
         'talent_types': EventTalent.TALENT_TYPE_CHOICES,
     }
     return render(request, 'home/event_form.html', context)
 
 @login_required
 def apply_for_event(request, event_id, talent_id):
-    if request.user.profile.role != 'performer':
+    if not request.is_performer:
         messages.error(request, 'Only performers can apply for events.')
         return redirect('event_detail', event_id=event_id)
     
@@ -225,12 +344,13 @@ def apply_for_event(request, event_id, talent_id):
         return redirect('event_detail', event_id=event_id)
     
     # Create application
-    EventApplication.objects.create(
+    application = EventApplication.objects.create(
         event=event,
         performer=request.user,
         talent_type=talent_need,
         status='pending'
     )
+    enqueue('home.tasks.send_new_application', application_id=application.id)
     
     messages.success(request, 'Application submitted successfully!')
     return redirect('event_detail', event_id=event_id)
@@ -256,7 +376,7 @@ def delete_event(request, event_id):
 
 @login_required
 def withdraw_application(request, event_id, talent_id):
-    if request.user.profile.role != 'performer':
+    if not request.is_performer:
         messages.error(request, 'Only performers can withdraw applications.')
         return redirect('event_detail', event_id=event_id)
     
@@ -285,18 +405,98 @@ def update_application_status(request, event_id, application_id, new_status):
         messages.error(request, 'You do not have permission to update application status.')
         return redirect('event_detail', event_id=event_id)
     
-    application = get_object_or_404(EventApplication, id=application_id, event=event)
+    application = get_object_or_404(EventApplication.objects.select_related('performer'), id=application_id, event=event)
     
     if request.method == 'POST':
+        if new_status == 'accepted':
+            conflict = booking_index([application.performer_id], [event.date], exclude_event=event).conflict(
+                application.performer_id, event.date, event.start_time, event.end_time
+            )
+            if conflict:
+                messages.error(request, f'{application.performer.username} is already booked for "{conflict}" at that time.')
+                return redirect('event_detail', event_id=event_id)
         if new_status in ['accepted', 'rejected']:
             application.status = new_status
             application.save()
+            enqueue('home.tasks.send_application_status', application_id=application.id)
             messages.success(request, f'Application {new_status} successfully.')
         else:
             messages.error(request, 'Invalid status update.')
     
     return redirect('event_detail', event_id=event_id)
 
+@login_required
+def accept_pending_applications(request, event_id):
+    event = get_object_or_404(Event, id=event_id)
+
+    if request.user != event.organizer:
+        messages.error(request, 'You do not have permission to update application status.')
+        return redirect('event_detail', event_id=event_id)
+
+    if request.method == 'POST':
+        pending = list(
+            event.applications.filter(status='pending').select_related('performer').order_by('created_at', 'id')
+        )
+        # One pair of queries loads the bookings of every applicant that day
+        index = booking_index({application.performer_id for application in pending}, [event.date], exclude_event=event)
+        # Places left per talent need; earlier applicants are accepted first
+        remaining = dict(event.talent_needs.values_list('id', 'quantity_needed'))
+        for talent_id, count in (
+            event.applications.filter(status='accepted').values_list('talent_type_id').annotate(count=Count('id'))
+        ):
+            remaining[talent_id] -= count
+        accepted, conflicts, overflow = [], [], []
+        for application in pending:
+            conflict = index.conflict(application.performer_id, event.date, event.start_time, event.end_time)
+            if conflict:
+                conflicts.append(f'{application.performer.username} ("{conflict}")')
+                continue
+            if remaining.get(application.talent_type_id, 0) <= 0:
+                overflow.append(application.performer.username)
+                continue
+            remaining[application.talent_type_id] -= 1
+            application.status = 'accepted'
+            application.updated_at = timezone.now()
+            accepted.append(application)
+
+        with transaction.atomic():
+            EventApplication.objects.bulk_update(accepted, ['status', 'updated_at'])
+            Event.bump_applications_version(event.id)
+            timeline.sync_event(event.id)
+            for application in accepted:
+                enqueue('home.tasks.send_application_status', application_id=application.id)
+
+        if accepted:
+            messages.success(request, f'Accepted {len(accepted)} application(s).')
+        if conflicts:
+            messages.error(request, 'Already booked at that time: ' + ', '.join(conflicts))
+        if overflow:
+            messages.error(request, 'No places left for their role: ' + ', '.join(overflow))
+
+    return redirect('event_detail', event_id=event_id)
+
+@login_required
+def export_applications(request, event_id=None):
+    if not request.is_organizer:
+        messages.error(request, 'Only organizers can export applications.')
+        return redirect('event_list')
+
+    filename = 'applications.csv'
+    if event_id is not None:
+        event = get_object_or_404(Event, id=event_id)
+        if request.user != event.organizer:
+            messages.error(request, 'You do not have permission to export these applications.')
+            return redirect('event_detail', event_id=event_id)
+        filename = f'event-{event.id}-applications.csv'
+
+    response = StreamingHttpResponse(
+        streaming_content(request, exports.stream_applications(request.user, event_id), exports.CHUNK_SIZE),
+        content_type='text/csv; charset=utf-8',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@replica_reads
 def events_json(request, username=None):
     from django.contrib.auth.models import User
     try:
@@ -304,48 +504,40 @@ def events_json(request, username=None):
             user = get_object_or_404(User, username=username)
         else:
             user = request.user
-            
-        # Events where user is organizer
-        organizer_events = Event.objects.filter(status='published', organizer=user)
-        
-        # Events where user is an accepted performer
-        performer_event_ids = EventApplication.objects.filter(
-            performer=user, status='accepted'
-        ).values_list('event_id', flat=True)
-        performer_events = Event.objects.filter(status='published', id__in=performer_event_ids)
-        
-        data = []
-        
-        # Add organizer events
-        for event in organizer_events:
-            data.append({
-                'id': f'organizer-{event.id}',
-                'title': f"[Organizing] {event.title}",
-                'start': f"{event.date}T{event.start_time}",
-                'end': f"{event.date}T{event.end_time}",
-                'url': f"/events/{event.id}/",
-                'backgroundColor': '#2563eb',  # blue
-                'borderColor': '#1d4ed8',
-                'display': 'block'
-            })
-        
-        # Add performer events
-        for event in performer_events:
-            data.append({
-                'id': f'performer-{event.id}',
-                'title': f"[Performing] {event.title}",
-                'start': f"{event.date}T{event.start_time}",
-                'end': f"{event.date}T{event.end_time}",
-                'url': f"/events/{event.id}/",
-                'backgroundColor': '#22c55e',  # green
-                'borderColor': '#16a34a',
-                'display': 'block'
-            })
-            
-        return JsonResponse(data, safe=False)
+
+        # Only the range FullCalendar is displaying is fetched and serialised
+        start, end = parse_window(request)
+        return JsonResponse(event_feed(user, start, end), safe=False)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
+def calendar_ics(request, username, token):
+    from django.contrib.auth.models import User
+    user = get_object_or_404(User, username=username)
+    if not constant_time_compare(token, ics.feed_token(user)):
+        raise Http404
+
+    # Answer unchanged polls from the timeline's version alone
+    etag, last_modified = ics.feed_version(user)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified and int(last_modified.timestamp()))
+    if not_modified is not None:
+        return not_modified
+
+    response = StreamingHttpResponse(
+        streaming_content(
+            request,
+            ics.render_feed(user, lambda event_id: request.build_absolute_uri(f'/events/{event_id}/')),
+            ics.CHUNK_SIZE,
+        ),
+        content_type='text/calendar; charset=utf-8',
+    )
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    response['Content-Disposition'] = f'inline; filename="{username}.ics"'
+    return response
+
+@replica_reads
 def availability_json(request, username=None):
     from django.contrib.auth.models import User
     try:
@@ -353,22 +545,9 @@ def availability_json(request, username=None):
             user = get_object_or_404(User, username=username)
         else:
             user = request.user
-            
-        availabilities = Availability.objects.filter(user=user)
-        data = []
-        
-        for avail in availabilities:
-            data.append({
-                'id': f'avail-{avail.id}',
-                'title': avail.note or 'Available',
-                'start': f"{avail.date}T{avail.start_time}",
-                'end': f"{avail.date}T{avail.end_time}",
-                'backgroundColor': '#38bdf8',  # light blue
-                'borderColor': '#0ea5e9',
-                'display': 'background'
-            })
-            
-        return JsonResponse(data, safe=False)
+
+        start, end = parse_window(request)
+        return JsonResponse(availability_feed(user, start, end), safe=False)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
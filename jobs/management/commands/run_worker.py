@@ -0,0 +1,55 @@
+import os
+import socket
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from accounts import realtime
+from jobs import queue
+
+
+class Command(BaseCommand):
+    help = 'Processes queued background jobs in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20, help='Jobs claimed per batch')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--stale-after', type=int, default=300,
+                            help='Seconds after which a running job is assumed abandoned')
+        parser.add_argument('--once', action='store_true', help='Process a single batch and exit')
+
+    def handle(self, *args, **options):
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.stdout.write(f'Worker {worker_id} started')
+        if settings.REALTIME_BROKER == 'accounts.realtime.InProcessBroker':
+            # Events published here would never reach the web workers' streams
+            self.stdout.write(self.style.WARNING(
+                'REALTIME_BROKER is InProcessBroker: notifications from jobs will not be pushed live'
+            ))
+        pruned_at = None
+        try:
+            while True:
+                if pruned_at is None or time.monotonic() - pruned_at > realtime.RETENTION_SECONDS:
+                    # Web processes only prune while streams are open
+                    realtime.prune_events()
+                    pruned_at = time.monotonic()
+
+                released = queue.requeue_stale(options['stale_after'])
+                if released:
+                    self.stdout.write(self.style.WARNING(f'Requeued {released} stale jobs'))
+
+                jobs = queue.claim(worker_id, options['batch_size'])
+                for job in jobs:
+                    if queue.run(job):
+                        self.stdout.write(f'Finished {job.task} (job {job.id})')
+                    else:
+                        self.stdout.write(self.style.ERROR(
+                            f'Job {job.id} ({job.task}) failed on attempt {job.attempts}: {job.status}'
+                        ))
+
+                if options['once']:
+                    break
+                if not jobs:
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write('Worker stopped')
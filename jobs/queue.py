@@ -0,0 +1,86 @@
+"""A small job queue stored in the application database.
+
+Jobs are enqueued as a dotted task path plus JSON kwargs, claimed in batches
+by ``manage.py run_worker``, retried with exponential backoff on failure and
+parked as ``dead`` once they run out of attempts. Finished jobs are deleted.
+"""
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+RETRY_BASE_SECONDS = 10
+RETRY_MAX_SECONDS = 60 * 60
+
+
+def enqueue(task, max_attempts=5, delay=None, **payload):
+    """Queue ``task`` (a dotted path) to run with ``payload`` as kwargs.
+
+    Enqueueing inside a transaction commits the job together with the rows
+    it refers to. With ``settings.JOBS_EAGER`` the task runs on commit instead.
+    """
+    if getattr(settings, 'JOBS_EAGER', False):
+        transaction.on_commit(lambda: import_string(task)(**payload))
+        return None
+    run_after = timezone.now() + delay if delay else timezone.now()
+    return Job.objects.create(task=task, payload=payload, max_attempts=max_attempts, run_after=run_after)
+
+
+def claim(worker_id, batch_size):
+    """Lock up to ``batch_size`` due jobs for ``worker_id`` and return them."""
+    now = timezone.now()
+    with transaction.atomic():
+        due = Job.objects.filter(status='queued', run_after__lte=now).order_by('run_after', 'id')
+        if connections[router.db_for_write(Job)].features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return []
+        # The status guard makes the claim safe on backends without row
+        # locks: a job another worker took first no longer matches.
+        Job.objects.filter(id__in=ids, status='queued').update(
+            status='running',
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+    return list(Job.objects.filter(id__in=ids, status='running', locked_by=worker_id, locked_at=now))
+
+
+def backoff(attempts):
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def run(job):
+    """Run a claimed job. Returns True if it succeeded."""
+    try:
+        import_string(job.task)(**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        job.locked_by = ''
+        job.locked_at = None
+        if job.attempts >= job.max_attempts:
+            job.status = 'dead'
+        else:
+            job.status = 'queued'
+            job.run_after = timezone.now() + backoff(job.attempts)
+        job.save(update_fields=['status', 'run_after', 'last_error', 'locked_by', 'locked_at', 'updated_at'])
+        return False
+    job.delete()
+    return True
+
+
+def requeue_stale(timeout):
+    """Release jobs whose worker stopped without finishing them."""
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return Job.objects.filter(status='running', locked_at__lt=cutoff).update(
+        status='queued',
+        locked_by='',
+        locked_at=None,
+    )
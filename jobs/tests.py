@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import queue
+from .models import Job
+
+CALLS = []
+
+
+def record(**kwargs):
+    CALLS.append(kwargs)
+
+
+def fail(**kwargs):
+    raise RuntimeError('boom')
+
+
+class QueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_claim_takes_due_jobs_once(self):
+        first = queue.enqueue('jobs.tests.record', n=1)
+        second = queue.enqueue('jobs.tests.record', n=2)
+        queue.enqueue('jobs.tests.record', delay=timedelta(hours=1), n=3)
+
+        claimed = queue.claim('worker-a', batch_size=10)
+        self.assertEqual([job.id for job in claimed], [first.id, second.id])
+        self.assertTrue(all(job.status == 'running' and job.attempts == 1 for job in claimed))
+        # Another worker finds nothing left that is due
+        self.assertEqual(queue.claim('worker-b', batch_size=10), [])
+
+    def test_claim_respects_batch_size(self):
+        for n in range(3):
+            queue.enqueue('jobs.tests.record', n=n)
+        self.assertEqual(len(queue.claim('worker', batch_size=2)), 2)
+        self.assertEqual(len(queue.claim('worker', batch_size=2)), 1)
+
+    def test_successful_job_runs_with_payload_and_is_deleted(self):
+        job = queue.enqueue('jobs.tests.record', n=1)
+        (claimed,) = queue.claim('worker', batch_size=1)
+        self.assertTrue(queue.run(claimed))
+        self.assertEqual(CALLS, [{'n': 1}])
+        self.assertFalse(Job.objects.filter(id=job.id).exists())
+
+    def test_failed_job_is_retried_with_backoff_then_dead(self):
+        job = queue.enqueue('jobs.tests.fail', max_attempts=2)
+        (claimed,) = queue.claim('worker', batch_size=1)
+        before = timezone.now()
+        self.assertFalse(queue.run(claimed))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+        self.assertGreaterEqual(job.run_after, before + queue.backoff(1))
+        self.assertIn('RuntimeError', job.last_error)
+        self.assertEqual(job.locked_by, '')
+
+        Job.objects.filter(id=job.id).update(run_after=timezone.now())
+        (claimed,) = queue.claim('worker', batch_size=1)
+        self.assertFalse(queue.run(claimed))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('dead', 2))
+        self.assertEqual(queue.claim('worker', batch_size=1), [])
+
+    def test_backoff_grows_and_is_capped(self):
+        self.assertEqual(queue.backoff(1), timedelta(seconds=queue.RETRY_BASE_SECONDS))
+        self.assertEqual(queue.backoff(2), timedelta(seconds=queue.RETRY_BASE_SECONDS * 2))
+        self.assertEqual(queue.backoff(50), timedelta(seconds=queue.RETRY_MAX_SECONDS))
+
+    def test_requeue_stale_releases_abandoned_jobs(self):
+        job = queue.enqueue('jobs.tests.record')
+        queue.claim('worker', batch_size=1)
+        Job.objects.filter(id=job.id).update(locked_at=timezone.now() - timedelta(minutes=10))
+        self.assertEqual(queue.requeue_stale(300), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), ('queued', ''))
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_mode_runs_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNone(queue.enqueue('jobs.tests.record', n=1))
+        self.assertEqual(CALLS, [{'n': 1}])
+        self.assertFalse(Job.objects.exists())